@@ -0,0 +1,115 @@
+"""
+Adaptive concurrency: the number of archives extracted at once follows the
+measured throughput instead of a fixed worker count.
+
+Every interval the controller samples the bytes extracted by the job and the
+share of CPU time spent waiting for I/O (iowait, Linux only), and moves the
+limit by hill climbing: one more worker while it pays off, back one when the
+last worker made things slower, and half as many (multiplicative decrease)
+when the storage is saturated.
+"""
+from time import perf_counter
+from collections import namedtuple
+
+# iowait share above which the storage is considered saturated, and below
+# which adding a worker is worth a try
+IOWAIT_HIGH = 0.5
+IOWAIT_LOW = 0.25
+
+# Relative throughput change below which two samples are considered equal
+THROUGHPUT_TOLERANCE = 0.05
+
+# Samples the limit stays put after going back, before probing again
+HOLD_SAMPLES = 3
+
+# One decision of the controller. throughput is in bytes per second, iowait a
+# fraction of the CPU time or None where it can't be read
+ConcurrencyDecision = namedtuple(
+    "ConcurrencyDecision",
+    ["limit", "previous_limit", "throughput", "iowait", "reason"]
+)
+
+
+def read_cpu_times():
+    """
+    Return (total CPU time, iowait time) in clock ticks from /proc/stat, or
+    None where it isn't available
+    """
+    try:
+        with open("/proc/stat", "r") as stat_file:
+            fields = stat_file.readline().split()
+    except OSError:
+        return None
+    if not fields or fields[0] != "cpu" or len(fields) < 6:
+        return None
+    times = [int(field) for field in fields[1:]]
+    # user nice system idle iowait irq softirq steal guest guest_nice; guest
+    # time is already counted in user and nice
+    return sum(times[:8]), times[4]
+
+
+class ConcurrencyController:
+    """
+    Chooses how many archives are extracted at once, between min_workers and
+    max_workers. Call step() with the bytes extracted so far at a regular
+    interval and apply the limit of the decision it returns
+    """
+
+    def __init__(self, max_workers, initial=None, min_workers=1):
+        self.min_workers = min_workers
+        self.max_workers = max(min_workers, max_workers)
+        # Start in the middle so a busy host isn't hit with every worker at once
+        self.limit = initial or max(min_workers, (self.max_workers + 1) // 2)
+        self._last_sample = None  # (time, bytes, CPU times)
+        self._last_throughput = None
+        self._added_worker = False
+        self._hold = 0
+
+    def step(self, current_bytes, now=None):
+        """
+        Sample the throughput and iowait since the previous call and return a
+        ConcurrencyDecision, or None on the first call
+        """
+        now = perf_counter() if now is None else now
+        cpu_times = read_cpu_times()
+        sample, self._last_sample = self._last_sample, (now, current_bytes, cpu_times)
+        if sample is None or now <= sample[0]:
+            return None
+
+        throughput = max(0, current_bytes - sample[1]) / (now - sample[0])
+        iowait = None
+        if cpu_times is not None and sample[2] is not None and cpu_times[0] > sample[2][0]:
+            iowait = (cpu_times[1] - sample[2][1]) / (cpu_times[0] - sample[2][0])
+
+        previous_limit = self.limit
+        reason = self._decide(throughput, iowait)
+        self._last_throughput = throughput
+        return ConcurrencyDecision(self.limit, previous_limit, throughput, iowait, reason)
+
+    def _decide(self, throughput, iowait):
+        added_worker, self._added_worker = self._added_worker, False
+        previous = self._last_throughput
+
+        if iowait is not None and iowait >= IOWAIT_HIGH and self.limit > self.min_workers:
+            self.limit = max(self.min_workers, self.limit // 2)
+            self._hold = HOLD_SAMPLES
+            return "storage saturated, halving"
+        if added_worker and previous and throughput < previous * (1 - THROUGHPUT_TOLERANCE):
+            self.limit = max(self.min_workers, self.limit - 1)
+            self._hold = HOLD_SAMPLES
+            return "the last worker made it slower, going back"
+        if added_worker and previous and throughput <= previous * (1 + THROUGHPUT_TOLERANCE):
+            self._hold = HOLD_SAMPLES
+            return "no gain from the last worker, holding"
+        if self._hold:
+            self._hold -= 1
+            return "holding"
+        if throughput <= 0:
+            return "no progress measured"
+        if self.limit >= self.max_workers:
+            return "at the maximum"
+        if iowait is not None and iowait >= IOWAIT_LOW:
+            return "storage busy, holding"
+        self.limit += 1
+        self._added_worker = True
+        return "probing one more worker"
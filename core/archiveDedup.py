@@ -0,0 +1,187 @@
+"""
+Detection of identical archives, so that only one copy of each is extracted
+and the others reuse its output.
+
+Archives are fingerprinted in stages: only archives of the same size get a
+partial hash (head and tail), and only archives whose partial hashes collide
+are hashed in full. Hashes are cached across runs keyed by the archive's
+device, inode and mtime.
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from collections import defaultdict
+
+HASH_CACHE_NAME = ".extraction-hashes.json"
+
+# Bytes hashed at each end of an archive for the partial hash
+PARTIAL_HASH_SIZE = 64 * 1024
+
+# ioctl cloning a file's extents on Linux (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+LINK_MODES = ("reflink", "hardlink", "copy")
+
+
+class HashCache:
+    """
+    Persistent cache of archive hashes, kept in the destination folder and keyed
+    by (device, inode, mtime) so a modified or replaced archive is hashed again
+    """
+
+    def __init__(self, destination_folder):
+        self.path = os.path.join(destination_folder, HASH_CACHE_NAME)
+        self._hashes = {}
+        self._changed = False
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as cache_file:
+                hashes = json.load(cache_file)
+            if isinstance(hashes, dict):
+                self._hashes = hashes
+        except (OSError, ValueError):
+            # Missing or damaged cache, everything is hashed again
+            self._hashes = {}
+        return self
+
+    @staticmethod
+    def _key(stat):
+        return f"{stat.st_dev}:{stat.st_ino}:{stat.st_mtime_ns}"
+
+    def get(self, stat, kind):
+        record = self._hashes.get(self._key(stat))
+        if record is None or record.get("size") != stat.st_size:
+            return None
+        return record.get(kind)
+
+    def put(self, stat, kind, digest):
+        record = self._hashes.setdefault(self._key(stat), {"size": stat.st_size})
+        record["size"] = stat.st_size
+        record[kind] = digest
+        self._changed = True
+
+    def save(self):
+        """
+        Write the cache atomically, if anything was hashed
+        """
+        if not self._changed:
+            return
+        folder = os.path.dirname(self.path) or "."
+        os.makedirs(folder, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(prefix=".extraction-hashes-", dir=folder)
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as cache_file:
+                json.dump(self._hashes, cache_file)
+            os.replace(temp_path, self.path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        self._changed = False
+
+
+def partial_hash(path, size):
+    digest = hashlib.blake2b(str(size).encode())
+    with open(path, "rb") as archive:
+        digest.update(archive.read(PARTIAL_HASH_SIZE))
+        if size > 2 * PARTIAL_HASH_SIZE:
+            archive.seek(-PARTIAL_HASH_SIZE, os.SEEK_END)
+            digest.update(archive.read(PARTIAL_HASH_SIZE))
+    return digest.hexdigest()
+
+
+def full_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as archive:
+        while True:
+            chunk = archive.read(1024 * 1024)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cached_hash(cache, path, kind, compute):
+    stat = os.stat(path)
+    digest = cache.get(stat, kind)
+    if digest is None:
+        digest = compute()
+        cache.put(stat, kind, digest)
+    return digest
+
+
+def _group_by(entries, key):
+    groups = defaultdict(list)
+    for entry in entries:
+        try:
+            groups[key(entry)].append(entry)
+        except OSError:
+            # Unreadable archive, it is extracted on its own
+            continue
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def find_duplicates(entries, cache):
+    """
+    Return {path of the first copy: [ManifestEntry of every other copy]} for the
+    archives of 'entries' with identical content. The first copy in manifest
+    order is the one extracted
+    """
+    duplicates = {}
+    # Split archives are left out, their first volumes alone don't identify them
+    entries = [entry for entry in entries if not entry.volumes]
+    for same_size in _group_by(entries, lambda entry: entry.size):
+        same_partial = _group_by(
+            same_size,
+            lambda entry: _cached_hash(cache, entry.path, "partial", lambda: partial_hash(entry.path, entry.size))
+        )
+        for candidates in same_partial:
+            for same_content in _group_by(
+                candidates,
+                lambda entry: _cached_hash(cache, entry.path, "full", lambda: full_hash(entry.path))
+            ):
+                duplicates[same_content[0].path] = same_content[1:]
+    return duplicates
+
+
+def reflink(source, destination):
+    """
+    Clone a file sharing its data blocks (copy-on-write). Raises OSError where
+    the platform or filesystem doesn't support it
+    """
+    import fcntl
+    with open(source, "rb") as source_file, open(destination, "wb") as destination_file:
+        try:
+            fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+        except OSError:
+            destination_file.close()
+            os.remove(destination)
+            raise
+    shutil.copystat(source, destination)
+
+
+def clone_file(source, destination, mode="reflink"):
+    """
+    Recreate 'source' at 'destination' with a reflink, a hard link or a copy,
+    falling back to a plain copy when the link isn't possible
+    """
+    if os.path.lexists(destination):
+        os.remove(destination)
+    if mode == "hardlink":
+        try:
+            os.link(source, destination)
+            return
+        except OSError:
+            pass
+    elif mode == "reflink":
+        try:
+            reflink(source, destination)
+            return
+        except (ImportError, OSError):
+            pass
+    shutil.copy2(source, destination)
@@ -0,0 +1,168 @@
+import os
+import re
+from collections import namedtuple
+
+# Supported archive extensions and the tool used to extract them
+ARCHIVE_FORMATS = {
+    # Common archive formats
+    '.zip': '7z',
+    '.rar': 'unrar',
+    '.7z': '7z',
+
+    # Tar and compressed tar formats
+    '.tar': '7z',
+    '.tar.gz': '7z',
+    '.tgz': '7z',
+    '.tar.bz2': '7z',
+    '.tbz2': '7z',
+    '.tar.xz': '7z',
+    '.txz': '7z',
+
+    # Compression formats
+    '.gz': '7z',
+    '.bz2': '7z',
+    '.xz': '7z',
+
+    # Disk and system image formats
+    '.wim': '7z',
+    '.iso': '7z',
+    '.cab': '7z',
+
+    # Legacy formats
+    '.arj': '7z',
+    '.lzh': '7z'
+}
+
+# Compressed tarballs, decompressed and unpacked in a single streamed pass
+STREAMED_FORMATS = frozenset(['.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz'])
+
+# Volume naming schemes of split archives: 'x.part2.rar', 'x.7z.002',
+# 'x.z01' (the set ends with 'x.zip') and 'x.r00' (the set starts with 'x.rar')
+VOLUME_PATTERNS = (
+    (re.compile(r'^(.+)\.part(\d+)\.rar$', re.IGNORECASE), 'part'),
+    (re.compile(r'^(.+)\.(\d{3})$'), 'split'),
+    (re.compile(r'^(.+)\.z(\d{2})$', re.IGNORECASE), 'zip'),
+    (re.compile(r'^(.+)\.r(\d{2})$', re.IGNORECASE), 'rar'),
+)
+
+# One volume of a split archive: the key shared by the volumes of a set, the
+# volume's position in the set and the set's archive format
+VolumeMatch = namedtuple("VolumeMatch", ["set_key", "index", "format"])
+
+
+class FormatRegistry:
+    """
+    Archive format matcher built once per job. Filenames are classified with a
+    suffix lookup that tries the longest compound extension first ('.tar.gz'
+    before '.gz'), against a frozen set of the selected formats
+    """
+
+    def __init__(self, selected_formats=None, formats=None):
+        self.formats = dict(formats or ARCHIVE_FORMATS)
+        self.selected_formats = frozenset(
+            fmt.lower().strip() for fmt in (selected_formats or [])
+        )
+
+        # Suffixes that may be the tail of a longer compound extension, e.g.
+        # '.gz' for '.tar.gz'; only those need a second look further left
+        self._tails = set()
+        for ext in self.formats:
+            dot = ext.find('.', 1)
+            while dot > 0:
+                self._tails.add(ext[dot:])
+                dot = ext.find('.', dot + 1)
+
+        # The match only depends on the last few characters of the path, so
+        # results are memoized on that tail
+        self._tail_length = max(len(ext) for ext in self.formats)
+        self._memo = {}
+
+        # For every known extension, the format to report once the selection is
+        # applied: '.tar.gz' falls back to '.gz' when only gzip is selected
+        self._resolved = {}
+        for ext in self.formats:
+            chain = sorted(
+                (other for other in self.formats if ext.endswith(other)),
+                key=len,
+                reverse=True
+            )
+            if self.selected_formats:
+                chain = [fmt for fmt in chain if fmt in self.selected_formats]
+            self._resolved[ext] = chain[0] if chain else None
+
+    def match(self, archive_path):
+        """
+        Return the selected format matching the archive path, or None
+        """
+        tail = archive_path[-self._tail_length:]
+        try:
+            return self._memo[tail]
+        except KeyError:
+            pass
+
+        extension = self._longest_extension(tail)
+        archive_format = self._resolved[extension] if extension else None
+        if len(self._memo) >= 65536:
+            self._memo.clear()
+        self._memo[tail] = archive_format
+        return archive_format
+
+    def match_volume(self, name):
+        """
+        Return a VolumeMatch if the file name is a volume of a split archive in
+        a selected format, or None
+        """
+        if not name[-1:].isdigit() and not name[-4:].lower() == '.rar':
+            return None
+
+        for pattern, scheme in VOLUME_PATTERNS:
+            found = pattern.match(name)
+            if found is None:
+                continue
+            base, index = found.groups()
+            if scheme == 'split':
+                # 'x.7z.001': the format is the one of the name without the number
+                extension = self._longest_extension(base)
+                archive_format = self._resolved[extension] if extension else None
+            elif scheme == 'zip':
+                archive_format = self._resolved['.zip']
+            else:
+                archive_format = self._resolved['.rar']
+            if archive_format is None:
+                return None
+            return VolumeMatch((base.lower(), scheme), int(index), archive_format)
+        return None
+
+    @staticmethod
+    def volume_head_key(name):
+        """
+        Return the set key a plain '.zip' or '.rar' archive would have if it
+        were the main volume of a 'x.z01' or 'x.r00' volume set
+        """
+        base, extension = os.path.splitext(name)
+        extension = extension.lower()
+        if extension == '.zip':
+            return base.lower(), 'zip'
+        if extension == '.rar':
+            return base.lower(), 'rar'
+        return None
+
+    def tool_for(self, archive_path):
+        """
+        Return the extraction tool ('7z' or 'unrar') for the archive path
+        """
+        extension = self._longest_extension(archive_path)
+        return self.formats[extension] if extension else '7z'
+
+    def _longest_extension(self, archive_path):
+        longest = None
+        dot = len(archive_path)
+        while True:
+            dot = archive_path.rfind('.', 0, dot)
+            if dot < 0:
+                return longest
+            suffix = archive_path[dot:].lower()
+            if suffix in self.formats:
+                longest = suffix
+            if suffix not in self._tails:
+                return longest
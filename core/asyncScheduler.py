@@ -0,0 +1,248 @@
+"""
+asyncio driver for the extraction engine: one event loop supervises every
+7z/unrar child process through asyncio.create_subprocess_exec, without a
+thread per archive.
+"""
+import os
+import asyncio
+import itertools
+from core.extractionEngine import ArchiveRun, ExtractionEngine
+from core.progressParser import ProgressParser
+from core.outputCapture import OutputCapture
+
+
+class AsyncExtractionScheduler(ExtractionEngine):
+    """
+    Runs an ExtractionJob on the current event loop. job.max_workers child
+    processes run at most at once, enforced with a semaphore; events and the
+    pull API behave like the threaded ExtractionEngine
+    """
+
+    def __init__(self, job, listeners=None, collect_logs=None):
+        super().__init__(job, listeners=listeners, collect_logs=collect_logs)
+        self._task_ids = itertools.count()
+
+    def run(self):
+        """
+        Blocking convenience wrapper running the job on a new event loop
+        """
+        return asyncio.run(self.run_async())
+
+    async def run_async(self):
+        """
+        Run the job to completion and return (time_taken, was_cancelled), or
+        None if the source folder is missing
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            # The scan and the folder creation are plain blocking filesystem calls
+            result = await loop.run_in_executor(None, self._begin_job)
+            if result:
+                await loop.run_in_executor(None, self.create_destination_folders)
+                await self._extract_all()
+                result = self._end_job()
+            else:
+                result = None
+        except asyncio.CancelledError:
+            # Cancelled by the host loop: listeners still get 'job_finished'
+            self.cancel()
+            result = 0, True
+            raise
+        except Exception as e:
+            self.log(f"Error during extraction: {str(e)}", "error")
+            result = 0, True
+        finally:
+            self.journal.close()
+            time_taken, was_cancelled = result if result is not None else (0, True)
+            self._publish(
+                "job_finished",
+                time_taken=time_taken,
+                cancelled=was_cancelled,
+                failed_files=self.failed_files,
+                source_missing=result is None
+            )
+        return result
+
+    async def _extract_all(self):
+        # The semaphore bounds the number of live tasks as well as the number of
+        # child processes, so huge manifests don't create all their tasks upfront
+        slots = asyncio.Semaphore(self.max_workers)
+        tasks = set()
+
+        def release(task):
+            tasks.discard(task)
+            slots.release()
+
+        async def entries():
+            while self._running:
+                with self._lock:
+                    entry = self._next_pending()
+                    if entry is not None:
+                        self._outstanding += 1
+                if entry is not None:
+                    yield entry
+                elif tasks:
+                    # Wait for a device to free up, or for inner archives; the
+                    # adaptive controller may raise the limit meanwhile
+                    await asyncio.wait(
+                        set(tasks),
+                        timeout=self.job.adaptive_interval if self._controller else None,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                else:
+                    return
+
+        async def adjust_concurrency():
+            while True:
+                await asyncio.sleep(self.job.adaptive_interval)
+                self._adjust_concurrency()
+
+        self._pending = await asyncio.get_running_loop().run_in_executor(None, self._pending_queues)
+        controller = asyncio.create_task(adjust_concurrency()) if self._controller else None
+        try:
+            async for entry in entries():
+                await slots.acquire()
+                if not self._running:
+                    slots.release()
+                    self._release_devices(entry)
+                    break
+                task = asyncio.create_task(self._extract_entry_async(entry))
+                tasks.add(task)
+                task.add_done_callback(release)
+        except asyncio.CancelledError:
+            # Cancelled by the host loop: stop the child processes now rather
+            # than waiting for them below
+            self.cancel()
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            if controller is not None:
+                controller.cancel()
+
+    async def _extract_entry_async(self, entry):
+        try:
+            succeeded = await self.extract_archive_async(
+                entry.path, entry.destination, entry.size, entry.depth, entry.volumes
+            )
+            # The journal fsyncs every record and duplicates are copied, keep it off the loop
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._record_completion, entry, succeeded)
+            if entry.path in self._duplicates:
+                await loop.run_in_executor(None, self._complete_duplicates, entry, succeeded)
+            if entry.depth:
+                await loop.run_in_executor(None, self._complete_nested, entry, succeeded)
+        finally:
+            self._release_devices(entry)
+
+    async def extract_archive_async(self, archive_path, destination_folder, archive_size=None, depth=0,
+                                    volumes=()):
+        run = ArchiveRun(archive_path, destination_folder, archive_size, next(self._task_ids), depth, volumes)
+        loop = asyncio.get_running_loop()
+        processes = []
+
+        try:
+            # Member-level resume lists the archive, keep it off the loop
+            await loop.run_in_executor(None, self._prepare_archive, run)
+            if run.native is not None:
+                # In-process extraction runs on the executor's threads
+                succeeded = await loop.run_in_executor(None, self._extract_native, run)
+                if succeeded is not None:
+                    return succeeded
+            if run.command is None:
+                # Nothing left to extract
+                return await loop.run_in_executor(None, self._finish_archive, run, True)
+
+            run.output_log = self._open_output_log(archive_path)
+            progress_stream, error_stream = await self._start_extractor_async(run, processes)
+
+            progress_capture = OutputCapture(log_file=run.output_log)
+            error_capture = OutputCapture(log_file=run.output_log)
+            parser = ProgressParser(self.format_registry.tool_for(archive_path))
+
+            async def read_progress():
+                while True:
+                    chunk = await progress_stream.read(65536)
+                    if not chunk:
+                        break
+                    progress_capture.write(chunk)
+                    parser.feed(chunk)
+                    with self._lock:
+                        self._in_flight[run.worker_id] = (run.weight * parser.fraction(), parser.members)
+                    self._publish_progress()
+
+            async def read_errors():
+                while True:
+                    chunk = await error_stream.read(65536)
+                    if not chunk:
+                        break
+                    error_capture.write(chunk)
+
+            await asyncio.gather(read_progress(), read_errors())
+            returncodes = await asyncio.gather(*(process.wait() for process in processes))
+            with self._lock:
+                self._processes.difference_update(processes)
+
+            # Merging the staged output moves files around, keep it off the loop
+            run.members = parser.members
+            return await loop.run_in_executor(
+                None,
+                self._finish_archive,
+                run,
+                all(returncode == 0 for returncode in returncodes),
+                self._error_output(run, returncodes, progress_capture, error_capture)
+            )
+        except asyncio.CancelledError:
+            for process in processes:
+                if process.returncode is None:
+                    process.terminate()
+            raise
+        except Exception as e:
+            self._archive_error(run, e)
+            return False
+        finally:
+            self._cleanup_archive(run)
+
+    async def _start_extractor_async(self, run, processes):
+        """
+        Start the extractor of an archive, adding its processes to 'processes',
+        and return (stream with its progress, stream with its errors)
+        """
+        if run.feeder_command is None:
+            process = await asyncio.create_subprocess_exec(
+                *run.command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                creationflags=self._creation_flags()
+            )
+            processes.append(process)
+            self._track_process(process)
+            return process.stdout, process.stderr
+
+        # Compressed tarball: the decompressor streams the tar into the tar
+        # extractor through an OS pipe the event loop never reads
+        read_end, write_end = os.pipe()
+        try:
+            feeder = await asyncio.create_subprocess_exec(
+                *run.feeder_command,
+                stdout=write_end,
+                stderr=asyncio.subprocess.PIPE,
+                creationflags=self._creation_flags()
+            )
+            processes.append(feeder)
+            self._track_process(feeder)
+            process = await asyncio.create_subprocess_exec(
+                *run.command,
+                stdin=read_end,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                creationflags=self._creation_flags()
+            )
+            processes.append(process)
+            self._track_process(process)
+        finally:
+            os.close(read_end)
+            os.close(write_end)
+        return feeder.stderr, process.stdout
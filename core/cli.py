@@ -0,0 +1,259 @@
+"""
+Headless command-line entry point: python -m core SOURCE DESTINATION
+
+Runs an extraction without loading any Qt module, printing progress to the
+terminal or as JSON lines for scripts and cron jobs.
+"""
+import sys
+import json
+import signal
+import argparse
+import threading
+from core.archiveFormats import ARCHIVE_FORMATS
+from core.archiveDedup import LINK_MODES
+from core.schedulingPolicy import SCHEDULING_POLICIES
+from core.extractionEngine import ExtractionEngine, ExtractionJob
+from core.logSetup import LOG_FILE, setup_logging
+
+# Exit codes
+EXIT_SUCCESS = 0
+EXIT_FAILURES = 1
+EXIT_ERROR = 2
+EXIT_CANCELLED = 130
+
+
+def parse_formats(value):
+    """
+    Turn 'zip,rar,.tar.gz' into ['.zip', '.rar', '.tar.gz']
+    """
+    formats = []
+    for fmt in value.split(","):
+        fmt = fmt.strip().lower()
+        if not fmt:
+            continue
+        if not fmt.startswith("."):
+            fmt = "." + fmt
+        if fmt not in ARCHIVE_FORMATS:
+            raise argparse.ArgumentTypeError(
+                f"unsupported format '{fmt}' (supported: {', '.join(ARCHIVE_FORMATS)})"
+            )
+        formats.append(fmt)
+    return formats
+
+
+def parse_device_limit(value):
+    """
+    Turn 'PATH=N' into (PATH, N)
+    """
+    path, separator, limit = value.rpartition("=")
+    if not separator or not path or not limit.isdigit() or int(limit) < 1:
+        raise argparse.ArgumentTypeError(f"expected PATH=N with N >= 1, got '{value}'")
+    return path, int(limit)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m core",
+        description="Extract every archive found in SOURCE into DESTINATION, "
+                    "preserving the folder structure."
+    )
+    parser.add_argument("source", help="folder scanned recursively for archives")
+    parser.add_argument("destination", help="folder receiving the extracted files")
+    parser.add_argument("-f", "--formats", type=parse_formats, default=[],
+                        help="comma-separated formats to extract, e.g. zip,rar,7z (default: all)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of archives extracted in parallel (default: CPU count)")
+    parser.add_argument("--schedule", choices=SCHEDULING_POLICIES, default="directory",
+                        help="order of the archives: scan order, largest first (shortest total "
+                             "time with several workers) or smallest first (default: directory)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="adjust the number of archives extracted at once, up to --workers, "
+                             "from the measured throughput and iowait")
+    parser.add_argument("--device-limit", metavar="PATH=N", type=parse_device_limit, action="append",
+                        default=[],
+                        help="extract at most N archives at once reading from or writing to the "
+                             "device holding PATH (default: 1 on spinning disks); repeatable")
+    parser.add_argument("--no-device-limits", action="store_true",
+                        help="ignore the devices the archives are on")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip the archives a previous run already extracted (see the journal "
+                             "in DESTINATION) and only extract the missing files of interrupted "
+                             "large archives")
+    parser.add_argument("--verify-crc", action="store_true",
+                        help="with --resume, also check the CRC of the files already extracted")
+    parser.add_argument("--dedup", action="store_true",
+                        help="extract identical archives only once and give the other copies "
+                             "the extracted files")
+    parser.add_argument("--dedup-link", choices=LINK_MODES, default="reflink",
+                        help="how the files are given to the copies, falling back to a plain "
+                             "copy (default: reflink)")
+    parser.add_argument("--recursive", metavar="DEPTH", type=int, default=0,
+                        help="also extract the archives found inside archives, down to DEPTH "
+                             "levels of nesting; inner archives are deleted once expanded")
+    parser.add_argument("--scratch", metavar="FOLDER", default=None,
+                        help="with --recursive, folder (e.g. a tmpfs) holding small inner "
+                             "archives until they are extracted")
+    parser.add_argument("--scratch-limit", metavar="MB", type=int, default=512,
+                        help="space used at most on the scratch folder (default: 512)")
+    parser.add_argument("--native-max-size", metavar="KB", type=int, default=4096,
+                        help="extract zip, tar and gz/bz2/xz archives up to this size in-process "
+                             "instead of starting 7z; 0 always uses 7z (default: 4096)")
+    parser.add_argument("--prescan", action="store_true",
+                        help="read the uncompressed size of every archive first, so progress and "
+                             "ETA follow the bytes written")
+    parser.add_argument("--disk-space", choices=("pause", "fail"), default=None,
+                        help="check the free space of DESTINATION before every archive (implies "
+                             "--prescan): archives that don't fit wait for space or fail right away")
+    parser.add_argument("--asyncio", action="store_true",
+                        help="supervise the extractor processes from one asyncio event loop")
+    parser.add_argument("--json", action="store_true",
+                        help="print logs and progress as JSON lines on stdout")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="seconds between progress updates (default: 1)")
+    parser.add_argument("--output-logs", metavar="FOLDER", default=None,
+                        help="write the full 7z/unrar output of every archive to FOLDER")
+    parser.add_argument("--log-file", default=LOG_FILE,
+                        help=f"rotated log file (default: {LOG_FILE})")
+    parser.add_argument("--log-json", action="store_true",
+                        help="write the log file as JSON lines")
+    return parser
+
+
+def format_size(size_bytes):
+    """Format size in bytes to a human-readable string"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size_bytes < 1024:
+            return f"{size_bytes:.1f} {unit}"
+        size_bytes /= 1024
+    return f"{size_bytes:.1f} TB"
+
+
+def format_time(seconds):
+    """Format time in seconds to a human-readable string"""
+    if seconds < 60:
+        return f"{int(seconds)}s"
+    elif seconds < 3600:
+        return f"{int(seconds / 60)}m {int(seconds % 60)}s"
+    return f"{int(seconds / 3600)}h {int((seconds % 3600) / 60)}m"
+
+
+class ConsoleReporter:
+    """
+    Print log records and progress snapshots, either for humans (progress
+    redrawn on one stderr line) or as JSON lines on stdout
+    """
+
+    def __init__(self, json_output):
+        self.json_output = json_output
+        self._progress_shown = False
+
+    def logs(self, records):
+        for message, status in records:
+            if self.json_output:
+                self._emit({"type": "log", "status": status, "message": message})
+            else:
+                self._clear_progress()
+                stream = sys.stderr if status == "error" else sys.stdout
+                print(f"[{status}] {message}", file=stream, flush=True)
+
+    def progress(self, snapshot):
+        if self.json_output:
+            self._emit(dict(snapshot._asdict(), type="progress"))
+            return
+
+        percentage = int(snapshot.current_bytes / snapshot.total_bytes * 100) if snapshot.total_bytes else 0
+        line = (
+            f"{percentage:3d}% | {snapshot.current_files} / {snapshot.total_files} archives | "
+            f"{format_size(snapshot.current_bytes)} / {format_size(snapshot.total_bytes)}"
+        )
+        if snapshot.extraction_speed > 0:
+            remaining = (snapshot.total_bytes - snapshot.current_bytes) / snapshot.extraction_speed
+            line += f" | {format_size(snapshot.extraction_speed)}/s | ETA {format_time(remaining)}"
+        if sys.stderr.isatty():
+            sys.stderr.write("\r\033[K" + line)
+            self._progress_shown = True
+        else:
+            sys.stderr.write(line + "\n")
+        sys.stderr.flush()
+
+    def finished(self, result, failed_files):
+        if self.json_output:
+            time_taken, was_cancelled = result if result else (0, True)
+            self._emit({
+                "type": "finished",
+                "time_taken": time_taken,
+                "cancelled": was_cancelled,
+                "failed_files": failed_files
+            })
+        else:
+            self._clear_progress()
+
+    def _clear_progress(self):
+        if self._progress_shown:
+            sys.stderr.write("\r\033[K")
+            self._progress_shown = False
+
+    @staticmethod
+    def _emit(event):
+        sys.stdout.write(json.dumps(event) + "\n")
+        sys.stdout.flush()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    setup_logging(args.log_file, json_lines=args.log_json)
+
+    job = ExtractionJob(
+        args.source,
+        args.destination,
+        args.formats,
+        max_workers=args.workers,
+        output_log_folder=args.output_logs,
+        resume=args.resume,
+        verify_crc=args.verify_crc,
+        dedup=args.dedup,
+        dedup_link=args.dedup_link,
+        recursive_depth=args.recursive,
+        scratch_folder=args.scratch,
+        scratch_limit=args.scratch_limit * 1024 * 1024,
+        native_max_size=args.native_max_size * 1024,
+        prescan_sizes=args.prescan,
+        disk_space_policy=args.disk_space,
+        schedule=args.schedule,
+        device_limits=False if args.no_device_limits else dict(args.device_limit),
+        adaptive=args.adaptive
+    )
+    if args.asyncio:
+        from core.asyncScheduler import AsyncExtractionScheduler
+        engine = AsyncExtractionScheduler(job)
+    else:
+        engine = ExtractionEngine(job)
+    reporter = ConsoleReporter(args.json)
+
+    # Ctrl+C / SIGTERM cancel the job cleanly instead of killing the interpreter
+    def request_cancel(signum, frame):
+        engine.cancel()
+    signal.signal(signal.SIGINT, request_cancel)
+    signal.signal(signal.SIGTERM, request_cancel)
+
+    result = []
+    job_thread = threading.Thread(target=lambda: result.append(engine.run()), daemon=True)
+    job_thread.start()
+    while job_thread.is_alive():
+        job_thread.join(args.interval)
+        reporter.logs(engine.take_logs())
+        if job_thread.is_alive() and engine.is_running():
+            reporter.progress(engine.progress_snapshot())
+
+    reporter.logs(engine.take_logs())
+    # Nothing in 'result' if run() raised
+    outcome = result[0] if result else None
+    if outcome is not None:
+        reporter.progress(engine.progress_snapshot())
+    reporter.finished(outcome, engine.failed_files)
+
+    if outcome is None:
+        return EXIT_ERROR
+    if outcome[1]:
+        return EXIT_CANCELLED
+    return EXIT_FAILURES if engine.failed_files else EXIT_SUCCESS
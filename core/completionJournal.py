@@ -0,0 +1,57 @@
+import os
+import json
+import threading
+
+JOURNAL_NAME = ".extraction-journal.jsonl"
+
+
+class CompletionJournal:
+    """
+    Append-only journal of extracted archives, kept in the destination folder.
+    Every line records an archive's path (relative to the source folder), size,
+    mtime and outcome, and is fsync'd so it survives a crash of the run
+    """
+
+    def __init__(self, destination_folder):
+        self.path = os.path.join(destination_folder, JOURNAL_NAME)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def load(self):
+        """
+        Return {relative path: (size, mtime_ns)} of the archives whose last
+        recorded outcome is a success
+        """
+        completed = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        record = json.loads(line)
+                        path = record["path"]
+                        if record["outcome"] == "ok":
+                            completed[path] = (record["size"], record["mtime_ns"])
+                        else:
+                            completed.pop(path, None)
+                    except (ValueError, KeyError, TypeError):
+                        # Line cut short by a crash
+                        continue
+        except OSError:
+            # No journal yet, or a destination that can't hold one: nothing to skip
+            pass
+        return completed
+
+    def record(self, path, size, mtime_ns, outcome):
+        line = json.dumps({"path": path, "size": size, "mtime_ns": mtime_ns, "outcome": outcome})
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,136 @@
+"""
+Per-device concurrency limits: archives are grouped by the devices they are
+read from and written to (st_dev), and each device runs at most a few
+extractions at once, so a spinning disk isn't made to seek between several
+7z processes while the other devices keep busy.
+"""
+import os
+from collections import deque
+
+# Extractions running at once on a device by default. Spinning disks get one,
+# SSDs and devices whose type is unknown (network shares, tmpfs, overlays) are
+# only bounded by the number of workers
+ROTATIONAL_LIMIT = 1
+
+# virtio and Xen disk names
+PARAVIRTUAL_DISKS = ("vd", "xvd")
+
+
+def is_rotational(device):
+    """
+    Return True for a spinning disk, False for a solid-state device and None
+    if it can't be told, from /sys/block/*/queue/rotational (Linux only)
+    """
+    try:
+        block_device = os.path.realpath(f"/sys/dev/block/{os.major(device)}:{os.minor(device)}")
+    except (AttributeError, OSError):
+        return None
+    # Partitions have their queue settings on the parent disk
+    for folder in (block_device, os.path.dirname(block_device)):
+        if os.path.basename(folder).startswith(PARAVIRTUAL_DISKS):
+            # Hypervisors report their virtual disks as rotational whatever
+            # the storage behind them
+            return None
+        try:
+            with open(os.path.join(folder, "queue", "rotational"), "r") as rotational:
+                return rotational.read().strip() == "1"
+        except OSError:
+            continue
+    return None
+
+
+def default_limit(device):
+    return ROTATIONAL_LIMIT if is_rotational(device) else None
+
+
+class DeviceQueues:
+    """
+    Pending archives grouped by their (source device, destination device), in
+    the order of the scheduling policy. pop() returns the first archive whose
+    devices both have a free slot; callers serialize the access.
+
+    limits maps a device (st_dev) to its limit; other devices get
+    default_limit(device), None meaning no limit. Without by_device, the
+    archives simply come out in order
+    """
+
+    def __init__(self, limits=None, by_device=True):
+        self.limits = dict(limits or {})
+        self.by_device = by_device
+        self._groups = {}  # (source device, destination device) -> deque of (order, entry)
+        self._running = {}  # device -> extractions running on it
+        self._folder_devices = {}  # folder -> st_dev
+        self._count = 0
+        self._next_order = 0
+
+    def __len__(self):
+        return self._count
+
+    def push(self, entry, first=False):
+        """
+        Add an archive, ahead of the others when 'first' is set
+        """
+        self._next_order += 1
+        order = (0 if first else 1, self._next_order)
+        self._groups.setdefault(self.devices_of(entry), deque()).append((order, entry))
+        self._count += 1
+
+    def pop(self):
+        """
+        Remove and return the next archive that can start, taking a slot on its
+        devices, or None if every pending archive waits for a busy device
+        """
+        best = None
+        for devices, group in self._groups.items():
+            if group and self._fits(devices) and (best is None or group[0][0] < best[1][0][0]):
+                best = devices, group
+        if best is None:
+            return None
+        devices, group = best
+        _, entry = group.popleft()
+        self._count -= 1
+        for device in set(devices):
+            self._running[device] = self._running.get(device, 0) + 1
+        return entry
+
+    def release(self, entry):
+        """
+        Free the slots an archive returned by pop() took
+        """
+        for device in set(self.devices_of(entry)):
+            self._running[device] -= 1
+
+    def devices_of(self, entry):
+        if not self.by_device:
+            return ()
+        return (
+            self._device(os.path.dirname(entry.path)),
+            self._device(entry.destination)
+        )
+
+    def _fits(self, devices):
+        for device in set(devices):
+            if device not in self.limits:
+                self.limits[device] = default_limit(device)
+            limit = self.limits[device]
+            if limit is not None and self._running.get(device, 0) >= limit:
+                return False
+        return True
+
+    def _device(self, folder):
+        device = self._folder_devices.get(folder)
+        if device is None:
+            # Destination folders may not exist yet, their parent tells the device
+            path = os.path.abspath(folder)
+            while True:
+                try:
+                    device = os.stat(path).st_dev
+                    break
+                except OSError:
+                    parent = os.path.dirname(path)
+                    if parent == path:
+                        device = 0
+                        break
+                    path = parent
+            self._folder_devices[folder] = device
+        return device
@@ -0,0 +1,1568 @@
+import os
+import errno
+import queue
+import hashlib
+import shutil
+import tempfile
+import threading
+import subprocess
+import concurrent.futures
+import logging
+import platform
+from time import perf_counter
+from collections import deque, namedtuple
+from core.archiveFormats import STREAMED_FORMATS, FormatRegistry
+from core.progressParser import ProgressParser, strip_progress
+from core.outputCapture import OutputCapture
+from core.completionJournal import CompletionJournal
+from core.memberResume import list_members, missing_members
+from core.archiveDedup import HashCache, clone_file, find_duplicates
+from core.nativeBackend import NATIVE_FORMATS, ExtractionCancelled, extract_native
+from core.sizeScan import unpacked_size
+from core.schedulingPolicy import WRITE_COST, estimated_cost, get_policy
+from core.deviceLimits import DeviceQueues
+from core.adaptiveConcurrency import ConcurrencyController
+
+logger = logging.getLogger(__name__)
+
+# Log records kept for take_logs(); older ones are dropped if nobody takes them
+MAX_LOG_RECORDS = 10000
+
+# Prefix of the private folders archives are extracted into before being
+# merged into their destination
+STAGING_PREFIX = ".extracting-"
+
+# One supported archive found while scanning the source folder. For a split
+# archive, path is the volume the extractor opens, size the size of the whole
+# set and volumes the paths of all its volumes. depth is 0 for the archives of
+# the source folder and n for archives found inside an archive of depth n - 1
+ManifestEntry = namedtuple(
+    "ManifestEntry",
+    ["path", "size", "format", "destination", "mtime_ns", "volumes", "depth"],
+    defaults=((), 0)
+)
+
+# Event published to the engine's listeners: kind is one of 'job_started',
+# 'archive_started', 'archive_finished', 'progress', 'log' and 'job_finished'
+ExtractionEvent = namedtuple("ExtractionEvent", ["kind", "data"])
+
+# Latest aggregated progress of a job, read by the UI at its own pace
+ProgressSnapshot = namedtuple(
+    "ProgressSnapshot",
+    ["current_files", "total_files", "current_bytes", "total_bytes", "extraction_speed", "members_done"]
+)
+
+
+class ArchiveRun:
+    """
+    State of one archive while it is being extracted
+    """
+
+    def __init__(self, archive_path, destination_folder, archive_size, worker_id, depth=0, volumes=()):
+        self.archive_path = archive_path
+        self.name = os.path.basename(archive_path)
+        self.destination_folder = destination_folder
+        self.size = archive_size
+        self.worker_id = worker_id
+        self.depth = depth
+        # Every volume of a split archive, empty for a single-file archive
+        self.volumes = volumes
+        # Bytes the archive counts for in the progress: its uncompressed size
+        # when known from the pre-scan, else its size
+        self.weight = archive_size
+        # (device, bytes) held on the destination's filesystem while extracting
+        self.reservation = None
+        # Where the extractor writes: the destination, or a private staging folder
+        self.extraction_folder = destination_folder
+        self.staging_folder = None
+        # Lock of the destination folder, held while extracting straight into
+        # a folder other workers merge into
+        self.destination_lock = None
+        # None when there is nothing left to extract
+        self.command = None
+        # Decompressor piped into the command, for compressed tarballs
+        self.feeder_command = None
+        # Format of an archive extracted in-process by core.nativeBackend
+        self.native = None
+        self.temp_files = []
+        self.output_log = None
+        self.members = 0
+        # Relative paths of the extracted files, kept for archives that have
+        # duplicates or may contain archives to extract recursively
+        self.outputs = None
+        # ManifestEntries of the archives found in the extracted files
+        self.nested = []
+
+
+class ExtractionJob:
+    """
+    Specification of an extraction job, independent of how and where it runs
+    """
+
+    def __init__(self, source_folder, destination_folder, selected_formats=None, max_workers=None,
+                 output_log_folder=None, progress_interval=0.1, resume=False,
+                 resume_min_size=256 * 1024 * 1024, verify_crc=False, dedup=False,
+                 dedup_link="reflink", recursive_depth=0, scratch_folder=None,
+                 scratch_limit=512 * 1024 * 1024, scratch_archive_limit=64 * 1024 * 1024,
+                 native_max_size=4 * 1024 * 1024, prescan_sizes=False, disk_space_policy=None,
+                 min_free_space=256 * 1024 * 1024, schedule="directory", device_limits=None,
+                 adaptive=False, adaptive_interval=2.0):
+        self.source_folder = source_folder
+        self.destination_folder = destination_folder
+        self.selected_formats = selected_formats or []
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        # Optional folder receiving the full extractor output of every archive
+        self.output_log_folder = output_log_folder
+        # Minimum number of seconds between two 'progress' events
+        self.progress_interval = progress_interval
+        # Skip the archives the destination's completion journal records as
+        # extracted, as long as their size and mtime are unchanged
+        self.resume = resume
+        # When resuming, archives of at least this size are compared member by
+        # member with the destination and only missing or truncated files are
+        # extracted again (also comparing CRCs with verify_crc). They are always
+        # extracted straight into the destination so an interrupted run leaves
+        # its files there, the other archives of the same folder waiting for them
+        self.resume_min_size = resume_min_size
+        self.verify_crc = verify_crc
+        # Extract identical archives once; the other copies get the extracted
+        # files through a reflink, a hard link or a copy (see core.archiveDedup)
+        self.dedup = dedup
+        self.dedup_link = dedup_link
+        # Extract the archives found in the extracted files too, down to this
+        # many levels of nesting (0 disables it). Inner archives are deleted
+        # once expanded, and those up to scratch_archive_limit bytes wait on the
+        # scratch folder (e.g. a tmpfs) as long as it holds less than
+        # scratch_limit bytes of them
+        self.recursive_depth = recursive_depth
+        self.scratch_folder = scratch_folder
+        self.scratch_limit = scratch_limit
+        self.scratch_archive_limit = scratch_archive_limit
+        # Zip, tar and gz/bz2/xz archives up to this size are extracted in-process
+        # instead of starting 7z (0 disables it)
+        self.native_max_size = native_max_size
+        # Read the uncompressed size of every archive before starting, so the
+        # progress and ETA follow the bytes written instead of the bytes read
+        self.prescan_sizes = prescan_sizes
+        # Check the free space of the destination before every archive (this
+        # turns the pre-scan on): with 'pause' an archive that doesn't fit waits
+        # for space, with 'fail' it fails right away. min_free_space is left free
+        self.disk_space_policy = disk_space_policy
+        self.min_free_space = min_free_space
+        # Order the archives are extracted in: 'directory' (scan order),
+        # 'largest_first', 'smallest_first' or a function, see core.schedulingPolicy
+        self.schedule = schedule
+        # Extractions running at once per device the archives are read from or
+        # written to: {path or st_dev: limit} overriding the defaults of
+        # core.deviceLimits (one on spinning disks), or False for no limits
+        self.device_limits = device_limits
+        # Adjust the number of archives extracted at once, between 1 and
+        # max_workers, every adaptive_interval seconds from the measured
+        # throughput and iowait (see core.adaptiveConcurrency)
+        self.adaptive = adaptive
+        self.adaptive_interval = adaptive_interval
+
+
+class ExtractionEngine:
+    """
+    Qt-independent extraction engine: runs an ExtractionJob, scanning the source
+    folder and extracting every supported archive with a pool of worker threads.
+
+    Callers either register listeners receiving ExtractionEvents from the
+    worker threads, or pull the state with progress_snapshot() and take_logs().
+    Log records are only collected for take_logs() without listeners, unless
+    collect_logs says otherwise
+    """
+
+    def __init__(self, job, listeners=None, collect_logs=None):
+        self.job = job
+        self.source_folder = job.source_folder
+        self.destination_folder = job.destination_folder
+        self.selected_formats = job.selected_formats
+        self.format_registry = FormatRegistry(job.selected_formats)
+        self.schedule = get_policy(job.schedule)
+        self.max_workers = job.max_workers
+        self.output_log_folder = job.output_log_folder
+        self.journal = CompletionJournal(job.destination_folder)
+        self.total_files = 0
+        self.processed_files = 0
+        self.total_size = 0
+        self.processed_size = 0
+        self.extracted_members = 0
+        self.failed_files = 0
+        self._running = False
+
+        # Filled by scan_source: supported archives and the destination folders to create
+        self.manifest = []
+        self.destination_folders = []
+
+        # For speed and ETA calculation
+        self.start_time = None
+
+        # Worker pool state, shared between the directory walk and the workers
+        self._lock = threading.Lock()
+        self._in_flight = {}  # worker id -> (bytes, members) done on its current archive
+        self._destination_locks = {}  # destination folder -> lock guarding merges into it
+        self._processes = set()  # extractor processes currently running
+
+        # Content deduplication: archive path -> ManifestEntries of its identical
+        # copies, and the files extracted from those archives
+        self._duplicates = {}
+        self._extracted_outputs = {}
+
+        # Archive path -> uncompressed size, from the pre-scan
+        self._unpacked_sizes = {}
+
+        # Disk space admission: worker id -> (device, bytes) reserved by the
+        # archive it extracts, and the condition archives waiting for space use
+        self._reservations = {}
+        self._space_released = threading.Condition(self._lock)
+
+        # Recursive extraction: inner archives waiting for the work queue, the
+        # number of queued archives not yet done, and the inner archives moved
+        # to the scratch folder (scratch path -> original path, size)
+        self._nested = deque()
+        self._outstanding = 0
+        self._work_done = threading.Condition(self._lock)
+
+        # Archives not handed to a worker yet, grouped by device (see _pending_queues)
+        self._pending = None
+        # Archives extracted at once, lowered by the adaptive controller
+        self._active_limit = self.max_workers
+        self._controller = None
+        self._scratch_files = {}
+        self._scratch_used = 0
+
+        # (message, status) log records, collected by the UI in batches with take_logs
+        self.collect_logs = listeners is None if collect_logs is None else collect_logs
+        self._log_records = deque(maxlen=MAX_LOG_RECORDS)
+
+        # Callbacks receiving the ExtractionEvents
+        self._listeners = list(listeners or [])
+        self._last_progress_event = 0
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _publish(self, kind, **data):
+        event = ExtractionEvent(kind, data)
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                # A faulty listener must not take a worker down with it
+                logger.exception(f"Extraction event listener failed on '{kind}'")
+
+    def _publish_progress(self, force=False):
+        """
+        Publish a 'progress' event, at most once per job.progress_interval
+        unless forced
+        """
+        if not self._listeners:
+            return
+        current_time = perf_counter()
+        with self._lock:
+            if not force and current_time - self._last_progress_event < self.job.progress_interval:
+                return
+            self._last_progress_event = current_time
+        self._publish("progress", snapshot=self.progress_snapshot())
+
+    def run(self):
+        """
+        Run the job to completion in the calling thread and return
+        (time_taken, was_cancelled), or None if the source folder is missing
+        """
+        try:
+            result = self._run_job()
+        finally:
+            self.journal.close()
+        time_taken, was_cancelled = result if result is not None else (0, True)
+        self._publish(
+            "job_finished",
+            time_taken=time_taken,
+            cancelled=was_cancelled,
+            failed_files=self.failed_files,
+            source_missing=result is None
+        )
+        return result
+
+    def _run_job(self):
+        try:
+            if not self._begin_job():
+                return None
+
+            # Bounded queue between the directory walk and the workers so the walk
+            # never runs far ahead of the extraction
+            work_queue = queue.Queue(maxsize=self.max_workers * 2)
+            workers = [
+                threading.Thread(target=self._worker_loop, args=(worker_id, work_queue), daemon=True)
+                for worker_id in range(self.max_workers)
+            ]
+            for worker in workers:
+                worker.start()
+            controller_stopped = threading.Event()
+            if self._controller is not None:
+                threading.Thread(target=self._controller_loop, args=(controller_stopped,), daemon=True).start()
+
+            try:
+                self.create_destination_folders()
+                self._pending = self._pending_queues()
+
+                while self._running:
+                    with self._work_done:
+                        entry = self._next_pending()
+                        # Wait for a device to free up, or for inner archives
+                        # while archives are being extracted
+                        while entry is None and self._running and self._outstanding:
+                            self._work_done.wait(0.1)
+                            entry = self._next_pending()
+                    if entry is None:
+                        break
+                    self._enqueue(work_queue, entry)
+            finally:
+                # One sentinel per worker, then wait for the in-flight archives to finish
+                for _ in workers:
+                    work_queue.put(None)
+                for worker in workers:
+                    worker.join()
+                controller_stopped.set()
+
+            return self._end_job()
+        except Exception as e:
+            self.log(f"Error during extraction: {str(e)}", "error")
+            return 0, True
+
+    def _begin_job(self):
+        """
+        Check the source folder, scan it and announce the job. Returns False if
+        the source folder is missing
+        """
+        if not os.path.isdir(self.source_folder):
+            self.log(f"The source folder '{self.source_folder}' does not exist.", "error")
+            return False
+
+        # Normalize the source folder path to preserve exact case
+        normalized_source_folder = self._get_exact_path(self.source_folder)
+        self.source_folder = normalized_source_folder
+
+        self._running = True
+        self.calculate_totals()
+        self.start_time = perf_counter()
+        if self.job.adaptive:
+            self._controller = ConcurrencyController(self.max_workers)
+            self._active_limit = self._controller.limit
+
+        self.log(
+            f"Starting extraction of {self.total_files} files from '{self.source_folder}' to "
+            f"'{self.destination_folder}' using {self.max_workers} worker(s)"
+            + (f", {self._active_limit} active to begin with" if self._controller else ""),
+            "info"
+        )
+        self._publish(
+            "job_started",
+            total_files=self.total_files,
+            total_bytes=self.total_size,
+            workers=self.max_workers
+        )
+        return True
+
+    def _end_job(self):
+        """
+        Log the outcome of the job and return (time_taken, was_cancelled)
+        """
+        total_time = round(perf_counter() - self.start_time, 2)
+        self._release_scratch()
+
+        if self._running and self._pending:
+            # Archives no device slot was ever free for
+            self.log(f"{len(self._pending)} archive(s) could not be scheduled within the device limits", "error")
+            with self._lock:
+                self.failed_files += len(self._pending)
+
+        if self._running:
+            self.log(
+                f"Extraction completed successfully in {total_time} seconds.",
+                "success"
+            )
+            return total_time, False
+        else:
+            self.log(
+                "Extraction was cancelled by user.",
+                "info"
+            )
+            return total_time, True
+
+    def create_destination_folders(self):
+        # Mirror the source directory structure
+        for destination_subfolder in self.destination_folders:
+            if not self._running:
+                break
+            os.makedirs(destination_subfolder, exist_ok=True)
+            self._remove_staging_folders(destination_subfolder)
+
+    def _remove_staging_folders(self, folder):
+        """
+        Delete the staging folders a crashed run left in a destination folder
+        """
+        try:
+            with os.scandir(folder) as entries:
+                leftovers = [
+                    entry.path for entry in entries
+                    if entry.name.startswith(STAGING_PREFIX) and entry.is_dir(follow_symlinks=False)
+                ]
+        except OSError:
+            return
+        for leftover in leftovers:
+            self.log(f"Removing the unfinished extraction '{leftover}'", "info")
+            shutil.rmtree(leftover, ignore_errors=True)
+
+    def _pending_queues(self):
+        limits = None
+        if self.job.device_limits:
+            for device, limit in self.job.device_limits.items():
+                if limit is not None and limit < 1:
+                    raise ValueError(f"The device limit of '{device}' must be at least 1, not {limit}")
+            limits = {
+                device if isinstance(device, int) else os.stat(device).st_dev: limit
+                for device, limit in self.job.device_limits.items()
+            }
+        pending = DeviceQueues(limits, by_device=self.job.device_limits is not False)
+        for entry in self.manifest:
+            pending.push(entry)
+        return pending
+
+    def _next_pending(self):
+        """
+        Return the next archive to extract, or None if none can start now.
+        Called with the lock held
+        """
+        # Inner archives go first, so the scratch folder empties quickly
+        while self._nested:
+            self._pending.push(self._nested.popleft(), first=True)
+        if self._outstanding >= self._active_limit:
+            return None
+        return self._pending.pop()
+
+    def _controller_loop(self, stopped):
+        while not stopped.wait(self.job.adaptive_interval):
+            self._adjust_concurrency()
+
+    def _adjust_concurrency(self):
+        """
+        Let the adaptive controller take a sample and apply its decision
+        """
+        decision = self._controller.step(self.progress_snapshot().current_bytes)
+        if decision is None:
+            return
+        with self._work_done:
+            self._active_limit = decision.limit
+            self._work_done.notify()
+
+        iowait = "n/a" if decision.iowait is None else f"{decision.iowait:.0%}"
+        message = (
+            f"Adaptive concurrency: {decision.throughput / (1024 * 1024):.2f} MiB/s, iowait {iowait}, "
+            f"{decision.previous_limit} -> {decision.limit} worker(s) ({decision.reason})"
+        )
+        if decision.limit != decision.previous_limit:
+            self.log(message, "info")
+        else:
+            # Kept out of the UI, the log file has every sample for tuning
+            logger.info(message)
+
+    def _release_devices(self, entry):
+        with self._work_done:
+            self._pending.release(entry)
+            self._outstanding -= 1
+            self._work_done.notify()
+
+    def _enqueue(self, work_queue, item):
+        """
+        Put an archive on the work queue, giving up if the job gets cancelled
+        while the queue is full
+        """
+        with self._lock:
+            self._outstanding += 1
+        while self._running:
+            try:
+                work_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        self._release_devices(item)
+
+    def _worker_loop(self, worker_id, work_queue):
+        while True:
+            item = work_queue.get()
+            if item is None:
+                break
+            if self._running:
+                succeeded = self.extract_archive(
+                    item.path, item.destination, worker_id, item.size, item.depth, item.volumes
+                )
+                self._record_completion(item, succeeded)
+                if item.path in self._duplicates:
+                    self._complete_duplicates(item, succeeded)
+                if item.depth:
+                    self._complete_nested(item, succeeded)
+            # Else drain the queue without extracting anything once cancelled
+            self._release_devices(item)
+
+    def _record_completion(self, entry, succeeded):
+        """
+        Append the outcome of an archive to the completion journal; archives
+        interrupted by a cancellation are left out
+        """
+        if not succeeded and not self._running or entry.depth:
+            return
+        try:
+            self.journal.record(
+                os.path.relpath(entry.path, self.source_folder),
+                entry.size,
+                entry.mtime_ns,
+                "ok" if succeeded else "failed"
+            )
+        except OSError as e:
+            self.log(f"Could not update the completion journal: {str(e)}", "error")
+
+    def _complete_duplicates(self, entry, succeeded):
+        """
+        Give the identical copies of an archive the files extracted from it,
+        instead of extracting them again
+        """
+        outputs, nested = self._extracted_outputs.pop(entry.path, (None, []))
+        try:
+            nested = nested + self._clone_duplicates(entry, succeeded, outputs, nested)
+        finally:
+            if nested:
+                self._queue_nested(nested)
+
+    def _clone_duplicates(self, entry, succeeded, outputs, nested):
+        """
+        Recreate the files of an archive for each of its duplicates and return
+        the ManifestEntries of their copies of its inner archives
+        """
+        duplicate_nested = []
+        if outputs is not None and nested:
+            # Inner archives are copied as they are and extracted again for
+            # every duplicate, the files they produce aren't in 'outputs'
+            inner_archives = {
+                os.path.relpath(path, entry.destination)
+                for inner in nested for path in self._inner_archive_files(inner).values()
+            }
+            outputs = [relative_path for relative_path in outputs if relative_path not in inner_archives]
+        for duplicate in self._duplicates.pop(entry.path):
+            if not self._running:
+                break
+            name = os.path.basename(duplicate.path)
+            self._publish("archive_started", path=duplicate.path, size=duplicate.size)
+            if not succeeded or outputs is None:
+                self.log(f"Failed to extract {name}: identical to {os.path.basename(entry.path)}, "
+                         f"which could not be extracted", "error")
+                with self._lock:
+                    self.failed_files += 1
+                self._publish("archive_finished", path=duplicate.path, success=False)
+                self._record_completion(duplicate, False)
+                continue
+
+            try:
+                if os.path.normcase(duplicate.destination) != os.path.normcase(entry.destination):
+                    with self._get_destination_lock(duplicate.destination):
+                        for relative_path in outputs:
+                            target = os.path.join(duplicate.destination, relative_path)
+                            os.makedirs(os.path.dirname(target), exist_ok=True)
+                            clone_file(os.path.join(entry.destination, relative_path), target, self.job.dedup_link)
+                        for inner in nested:
+                            duplicate_nested.append(self._clone_inner_archive(inner, entry, duplicate))
+            except OSError as e:
+                self.log(f"Error extracting {name}: {str(e)}", "error")
+                with self._lock:
+                    self.failed_files += 1
+                self._publish("archive_finished", path=duplicate.path, success=False)
+                self._record_completion(duplicate, False)
+                continue
+
+            with self._lock:
+                self.processed_files += 1
+                self.processed_size += self._unpacked_sizes.get(entry.path, duplicate.size)
+                self.extracted_members += len(outputs)
+            self.log(f"Successfully extracted {name} (identical to {entry.path})", "success")
+            self._publish("archive_finished", path=duplicate.path, success=True)
+            self._publish_progress(force=True)
+            self._record_completion(duplicate, True)
+        return duplicate_nested
+
+    def _inner_archive_files(self, inner):
+        """
+        Return {current path: path in the extracted files} for the files of an
+        inner archive, which may wait on the scratch folder
+        """
+        with self._lock:
+            scratch = self._scratch_files.get(inner.path)
+        if scratch is not None:
+            return {inner.path: scratch[0]}
+        return {path: path for path in inner.volumes or (inner.path,)}
+
+    def _clone_inner_archive(self, inner, entry, duplicate):
+        """
+        Copy an inner archive of an archive to the same place among the files
+        of one of its duplicates and return the ManifestEntry of the copy
+        """
+        copies = {}
+        for path, extracted_path in self._inner_archive_files(inner).items():
+            target = os.path.join(duplicate.destination, os.path.relpath(extracted_path, entry.destination))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            clone_file(path, target, self.job.dedup_link)
+            copies[path] = target
+        return inner._replace(
+            path=copies[inner.path],
+            destination=os.path.dirname(copies[inner.path]),
+            volumes=tuple(copies[volume] for volume in inner.volumes)
+        )
+
+    def _find_nested(self, run):
+        """
+        Find the archives among the files extracted from an archive and return
+        their ManifestEntries, moving the small ones to the scratch folder
+        """
+        folders = {}  # folder -> (archives, volume sets) found in it
+        for relative_path in run.outputs:
+            path = os.path.join(run.extraction_folder, relative_path)
+            if not os.path.isfile(path):
+                # Already in the destination when resuming member by member
+                path = os.path.join(run.destination_folder, relative_path)
+            archives, volume_sets = folders.setdefault(os.path.dirname(relative_path), ([], {}))
+            try:
+                self._collect_archive(path, os.path.join(run.destination_folder, relative_path),
+                                      archives, volume_sets, run.depth + 1)
+            except OSError:
+                continue
+
+        nested = []
+        for archives, volume_sets in folders.values():
+            if volume_sets:
+                archives = self._group_volumes(archives, volume_sets)
+            nested.extend(self._move_to_scratch(entry, run) for entry in archives)
+        return nested
+
+    def _collect_archive(self, path, final_path, archives, volume_sets, depth=0):
+        """
+        Add the file at 'path' to the archives or volume sets of its folder if
+        it is a supported archive; the entry points at 'final_path'
+        """
+        name = os.path.basename(path)
+        volume = self.format_registry.match_volume(name)
+        archive_format = volume.format if volume else self.get_archive_format(name)
+        if not archive_format:
+            return
+        stat = os.stat(path)
+        archive = ManifestEntry(
+            final_path,
+            stat.st_size,
+            archive_format,
+            os.path.dirname(final_path),
+            stat.st_mtime_ns,
+            depth=depth
+        )
+        if volume:
+            volume_sets.setdefault(volume.set_key, []).append((volume.index, archive))
+        else:
+            archives.append(archive)
+
+    def _move_to_scratch(self, entry, run):
+        """
+        Move a small inner archive from the staging folder to the scratch
+        folder, if there is room left on it
+        """
+        if not self.job.scratch_folder or entry.volumes or entry.size > self.job.scratch_archive_limit:
+            return entry
+        staged_path = os.path.join(run.extraction_folder, os.path.relpath(entry.path, run.destination_folder))
+        if not os.path.isfile(staged_path):
+            return entry
+        with self._lock:
+            if self._scratch_used + entry.size > self.job.scratch_limit:
+                return entry
+            self._scratch_used += entry.size
+
+        try:
+            scratch_path = os.path.join(
+                tempfile.mkdtemp(prefix="extract-", dir=self.job.scratch_folder),
+                os.path.basename(entry.path)
+            )
+            shutil.move(staged_path, scratch_path)
+        except OSError as e:
+            self.log(f"Could not use the scratch folder: {str(e)}", "error")
+            with self._lock:
+                self._scratch_used -= entry.size
+            return entry
+
+        with self._lock:
+            self._scratch_files[scratch_path] = (entry.path, entry.size)
+        return entry._replace(path=scratch_path)
+
+    def _queue_nested(self, nested):
+        with self._lock:
+            self.total_files += len(nested)
+            self.total_size += sum(entry.size for entry in nested)
+        for entry in nested:
+            self.log(f"Queued inner archive {os.path.basename(entry.path)} (depth {entry.depth})", "info")
+        self._nested.extend(nested)
+
+    def _complete_nested(self, entry, succeeded):
+        """
+        Delete an inner archive once expanded; one that failed is left where it
+        was extracted, as without recursive extraction
+        """
+        with self._lock:
+            scratch = self._scratch_files.pop(entry.path, None)
+            if scratch is not None:
+                self._scratch_used -= scratch[1]
+        try:
+            if scratch is not None:
+                if not succeeded:
+                    shutil.move(entry.path, scratch[0])
+                shutil.rmtree(os.path.dirname(entry.path), ignore_errors=True)
+            elif succeeded:
+                for path in entry.volumes or (entry.path,):
+                    os.remove(path)
+        except OSError as e:
+            self.log(f"Could not remove the inner archive {os.path.basename(entry.path)}: {str(e)}", "error")
+
+    def _release_scratch(self):
+        """
+        Put back the inner archives left on the scratch folder by a cancelled job
+        """
+        with self._lock:
+            leftovers = list(self._scratch_files.items())
+            self._scratch_files.clear()
+            self._scratch_used = 0
+        for scratch_path, (original_path, _) in leftovers:
+            try:
+                shutil.move(scratch_path, original_path)
+            except OSError as e:
+                self.log(f"Could not move {scratch_path} back to {original_path}: {str(e)}", "error")
+            shutil.rmtree(os.path.dirname(scratch_path), ignore_errors=True)
+
+    def _get_destination_lock(self, destination_folder):
+        with self._lock:
+            lock = self._destination_locks.get(destination_folder)
+            if lock is None:
+                lock = self._destination_locks[destination_folder] = threading.Lock()
+            return lock
+
+    def _merge_tree(self, source, destination):
+        """
+        Move the content of a staging folder into its destination, overwriting
+        existing files the same way '7z x -y' would
+        """
+        for entry in os.listdir(source):
+            source_path = os.path.join(source, entry)
+            destination_path = os.path.join(destination, entry)
+            if os.path.isdir(source_path) and not os.path.islink(source_path):
+                if os.path.isdir(destination_path):
+                    self._merge_tree(source_path, destination_path)
+                    continue
+                if os.path.lexists(destination_path):
+                    os.remove(destination_path)
+            elif os.path.isdir(destination_path) and not os.path.islink(destination_path):
+                shutil.rmtree(destination_path)
+            os.replace(source_path, destination_path)
+
+    def progress_snapshot(self):
+        """
+        Return the aggregated progress of all workers at this instant
+        """
+        with self._lock:
+            current_bytes = self.processed_size + sum(done for done, _ in self._in_flight.values())
+            members_done = self.extracted_members + sum(members for _, members in self._in_flight.values())
+            processed_files = self.processed_files
+
+        elapsed = perf_counter() - self.start_time if self.start_time else 0
+        speed = current_bytes / elapsed if elapsed > 0 else 0
+
+        return ProgressSnapshot(
+            processed_files,
+            self.total_files,
+            int(min(current_bytes, self.total_size)),
+            self.total_size,
+            speed,
+            members_done
+        )
+
+    def _read_progress(self, stream, capture, parser, worker_id, archive_size):
+        """
+        Feed the extractor's progress output to the parser as it arrives. The
+        read blocks until the child writes something, and the worker's share of
+        the progress snapshot is updated independently of the process supervision
+        """
+        while True:
+            chunk = stream.read1(65536)
+            if not chunk:
+                break
+            capture.write(chunk)
+            parser.feed(chunk)
+
+            with self._lock:
+                self._in_flight[worker_id] = (archive_size * parser.fraction(), parser.members)
+            self._publish_progress()
+
+    def extract_archive(self, archive_path, destination_folder, worker_id=0, archive_size=None, depth=0,
+                        volumes=()):
+        # The size is already known for archives coming from the scan manifest
+        if archive_size is None and not os.path.isfile(archive_path):
+            self.log(f"The archive '{archive_path}' does not exist.", "error")
+            return False
+
+        run = ArchiveRun(archive_path, destination_folder, archive_size, worker_id, depth, volumes)
+
+        try:
+            self._prepare_archive(run)
+            if run.native is not None:
+                succeeded = self._extract_native(run)
+                if succeeded is not None:
+                    return succeeded
+            if run.command is None:
+                # Nothing left to extract
+                return self._finish_archive(run, True)
+
+            # Both pipes are drained continuously so the child never blocks on a
+            # full pipe; only the tail of each stream is kept in memory
+            run.output_log = self._open_output_log(archive_path)
+            processes, progress_stream, error_stream = self._start_extractor(run)
+            progress_capture = OutputCapture(log_file=run.output_log)
+            error_capture = OutputCapture(log_file=run.output_log)
+
+            # Parse the real progress reported by the extractor while it runs
+            parser = ProgressParser(self.format_registry.tool_for(archive_path))
+            progress_reader = threading.Thread(
+                target=self._read_progress,
+                args=(progress_stream, progress_capture, parser, worker_id, run.weight),
+                daemon=True
+            )
+            progress_reader.start()
+
+            # Block until the processes exit: the error stream reaches EOF when
+            # the child closes it, and cancel() terminates the running processes
+            error_capture.drain(error_stream)
+            returncodes = [process.wait() for process in processes]
+            progress_reader.join()
+            with self._lock:
+                self._processes.difference_update(processes)
+
+            run.members = parser.members
+            return self._finish_archive(
+                run,
+                all(returncode == 0 for returncode in returncodes),
+                self._error_output(run, returncodes, progress_capture, error_capture)
+            )
+        except Exception as e:
+            self._archive_error(run, e)
+            return False
+        finally:
+            self._cleanup_archive(run)
+
+    def _start_extractor(self, run):
+        """
+        Start the extractor of an archive and return (processes, stream with its
+        progress, stream with its errors)
+        """
+        if run.feeder_command is None:
+            process = subprocess.Popen(
+                run.command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                creationflags=self._creation_flags()
+            )
+            self._track_process(process)
+            return [process], process.stdout, process.stderr
+
+        # Compressed tarball: the decompressor streams the tar into the tar
+        # extractor through a pipe and reports its progress on stderr
+        feeder = subprocess.Popen(
+            run.feeder_command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            creationflags=self._creation_flags()
+        )
+        self._track_process(feeder)
+        try:
+            process = subprocess.Popen(
+                run.command,
+                stdin=feeder.stdout,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                creationflags=self._creation_flags()
+            )
+        except OSError:
+            feeder.kill()
+            feeder.wait()
+            raise
+        finally:
+            # Only the tar extractor holds the read end, so the decompressor
+            # gets a broken pipe if the extractor dies
+            feeder.stdout.close()
+        self._track_process(process)
+        return [feeder, process], feeder.stderr, process.stdout
+
+    def _prepare_archive(self, run):
+        """
+        Log the start of an archive and work out the command extracting it.
+        With several workers, archives sharing a destination folder are
+        extracted into a private staging folder first and merged afterwards,
+        except for those large enough to be resumed member by member, which
+        hold the destination folder for themselves instead
+        """
+        if run.size is None:
+            run.size = os.path.getsize(run.archive_path)
+        run.weight = self._unpacked_sizes.get(run.archive_path, run.size)
+        if self.job.disk_space_policy:
+            self._reserve_space(run)
+
+        self.log(f"Extracting {run.name}...", "info")
+        self._publish("archive_started", path=run.archive_path, size=run.size)
+
+        archive_format = self.get_archive_format(run.archive_path)
+        member_list = None
+        # What a resumable archive extracted before an interruption must be in
+        # the destination for the next run to skip it
+        resumable = archive_format not in STREAMED_FORMATS and run.size >= self.job.resume_min_size
+        if resumable:
+            if self.job.resume:
+                member_list = self._resume_member_list(run)
+                if member_list == []:
+                    self.log(f"All the files of {run.name} are already extracted", "info")
+                    return
+            if run.outputs is None and self._needs_outputs(run):
+                members = list_members(run.archive_path, self._creation_flags())
+                if members:
+                    run.outputs = [member.path for member in members if not member.is_dir]
+
+        # The files extracted from an archive with identical copies or possibly
+        # containing archives are collected from a staging folder as well,
+        # unless the listing of a resumable archive already tells them
+        if (self.max_workers > 1 and not resumable) or (self._needs_outputs(run) and run.outputs is None):
+            run.staging_folder = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=run.destination_folder)
+            run.extraction_folder = run.staging_folder
+        elif self.max_workers > 1:
+            # The merges of the other archives into the folder, and the other
+            # archives extracted straight into it, wait until this one is done
+            self._hold_destination(run)
+
+        if archive_format in STREAMED_FORMATS:
+            run.feeder_command, run.command = self.get_stream_commands(run.archive_path, run.extraction_folder)
+        else:
+            run.command = self.get_extractor_command(run.archive_path, run.extraction_folder, member_list)
+
+        # Small archives in a format the standard library reads are extracted
+        # in-process; the command is kept in case that fails. The standard
+        # library doesn't read split archives
+        if (archive_format in NATIVE_FORMATS and member_list is None and not run.volumes
+                and 0 < self.job.native_max_size >= run.size):
+            run.native = archive_format
+            self.log(f"Extracting {run.name} in-process to {run.destination_folder}", "info")
+            return
+
+        self._log_command(run)
+
+    def _hold_destination(self, run):
+        """
+        Take the lock of an archive's destination folder for the whole
+        extraction. Raises ExtractionCancelled if the job is cancelled while
+        waiting for it
+        """
+        lock = self._get_destination_lock(run.destination_folder)
+        if not lock.acquire(blocking=False):
+            self.log(f"Waiting for the other archives writing into '{run.destination_folder}'", "info")
+            while not lock.acquire(timeout=1):
+                if not self._running:
+                    raise ExtractionCancelled()
+        run.destination_lock = lock
+
+    def _reserve_space(self, run):
+        """
+        Reserve the uncompressed size of an archive on its destination's
+        filesystem. The space still to be written by the archives in progress
+        counts as used. Raises OSError(ENOSPC) if it doesn't fit and the policy
+        is 'fail'; with 'pause', waits until it fits. Raises ExtractionCancelled
+        if the job is cancelled while waiting
+        """
+        device = os.stat(run.destination_folder).st_dev
+        announced = False
+        while True:
+            # statvfs may be slow (network shares), it runs outside of the lock
+            # the progress snapshots take
+            free = shutil.disk_usage(run.destination_folder).free
+            with self._space_released:
+                available = self._available_space(free, device)
+                if run.weight <= available:
+                    run.reservation = device, run.weight
+                    self._reservations[run.worker_id] = run.reservation
+                    return
+                if not self._running:
+                    raise ExtractionCancelled()
+
+                shortage = (f"{run.name} needs {run.weight / (1024 * 1024):.1f} MB but only "
+                            f"{max(available, 0) / (1024 * 1024):.1f} MB are available on the destination")
+                if self.job.disk_space_policy == "fail":
+                    raise OSError(errno.ENOSPC, f"Not enough disk space: {shortage}")
+                if not announced:
+                    self.log(f"Waiting for disk space: {shortage}", "info")
+                    announced = True
+                # Woken up when an archive finishes; space freed by other
+                # programs and cancellation are noticed by polling
+                self._space_released.wait(1)
+
+    def _available_space(self, free, device):
+        """
+        Free space of a filesystem, minus the space reserved by the archives in
+        progress on it that they didn't write yet and the margin. Called with
+        the lock held
+        """
+        pending = sum(
+            max(reserved - self._in_flight.get(worker_id, (0, 0))[0], 0)
+            for worker_id, (reserved_device, reserved) in self._reservations.items()
+            if reserved_device == device
+        )
+        return free - pending - self.job.min_free_space
+
+    def _check_disk_space(self):
+        """
+        Report upfront when the archives of the job won't fit on the destination
+        """
+        folder = os.path.abspath(self.destination_folder)
+        while not os.path.isdir(folder):
+            folder = os.path.dirname(folder)
+        free = shutil.disk_usage(folder).free - self.job.min_free_space
+        if self.total_size > free:
+            self.log(
+                f"The archives need {self.total_size / (1024 * 1024):.1f} MB but the destination only has "
+                f"{max(free, 0) / (1024 * 1024):.1f} MB free; archives that don't fit will "
+                f"{'wait for space' if self.job.disk_space_policy == 'pause' else 'fail'}",
+                "error"
+            )
+
+    def _log_command(self, run):
+        # Log the exact command and paths being used
+        command = ' '.join(run.command)
+        if run.feeder_command:
+            command = f"{' '.join(run.feeder_command)} | {command}"
+        self.log(f"Executing command: {command}", "info")
+        self.log(f"Archive path: {run.archive_path}", "info")
+        self.log(f"Destination folder: {run.destination_folder}", "info")
+
+    def _extract_native(self, run):
+        """
+        Extract an archive with core.nativeBackend. Returns whether it was
+        extracted, or None if it must be handed over to the external tool
+        """
+        def on_progress(fraction, files):
+            with self._lock:
+                self._in_flight[run.worker_id] = (run.weight * fraction, files)
+            self._publish_progress()
+            return self._running
+
+        try:
+            run.members = extract_native(run.archive_path, run.native, run.extraction_folder, on_progress)
+        except ExtractionCancelled:
+            return self._finish_archive(run, False, "cancelled")
+        except Exception as e:
+            # Corrupted, encrypted or using a method the standard library lacks
+            self.log(f"In-process extraction of {run.name} failed ({str(e)}), using {run.command[0]}", "info")
+            with self._lock:
+                self._in_flight.pop(run.worker_id, None)
+            if run.staging_folder:
+                shutil.rmtree(run.staging_folder, ignore_errors=True)
+                os.makedirs(run.staging_folder, exist_ok=True)
+            self._log_command(run)
+            return None
+        return self._finish_archive(run, True)
+
+    def _resume_member_list(self, run):
+        """
+        Compare the listing of a large archive with its destination folder and
+        return the path of a list file naming the members still to extract, []
+        if nothing is missing, or None to extract the whole archive
+        """
+        members = list_members(run.archive_path, self._creation_flags())
+        if not members:
+            return None
+
+        if self._needs_outputs(run):
+            run.outputs = [member.path for member in members if not member.is_dir]
+        missing = missing_members(members, run.destination_folder, self.job.verify_crc)
+        file_count = sum(1 for member in members if not member.is_dir)
+        if not missing:
+            return []
+        if len(missing) == file_count:
+            # Nothing extracted yet
+            return None
+
+        self.log(
+            f"Resuming {run.name}: {len(missing)} of {file_count} files missing or incomplete",
+            "info"
+        )
+        list_file, list_path = tempfile.mkstemp(prefix="extract-", suffix=".lst")
+        with os.fdopen(list_file, "w", encoding="utf-8") as members_file:
+            members_file.write("\n".join(missing) + "\n")
+        run.temp_files.append(list_path)
+        return list_path
+
+    @staticmethod
+    def _creation_flags():
+        # Platform-specific process creation flags
+        if platform.system() == "Windows":
+            return subprocess.CREATE_NO_WINDOW
+        return 0
+
+    def _track_process(self, process):
+        with self._lock:
+            self._processes.add(process)
+        if not self._running:
+            # Cancelled while the process was starting
+            process.terminate()
+
+    def _finish_archive(self, run, succeeded, error_output=""):
+        """
+        Merge the staged output and account for an archive whose extractor
+        exited. Returns True if the archive was extracted
+        """
+        if succeeded and self._running:
+            if run.outputs is None and run.staging_folder and self._needs_outputs(run):
+                run.outputs = self._staged_files(run.staging_folder)
+            if run.depth < self.job.recursive_depth:
+                run.nested = self._find_nested(run)
+            if run.staging_folder:
+                with self._get_destination_lock(run.destination_folder):
+                    self._merge_tree(run.staging_folder, run.destination_folder)
+            if run.archive_path in self._duplicates:
+                # The inner archives are queued once copied for the duplicates
+                self._extracted_outputs[run.archive_path] = run.outputs, run.nested
+            elif run.nested:
+                self._queue_nested(run.nested)
+
+            # Update progress after successful extraction
+            with self._lock:
+                self._in_flight.pop(run.worker_id, None)
+                self.processed_files += 1
+                self.processed_size += run.weight
+                self.extracted_members += run.members
+
+            self.log(f"Successfully extracted {run.name}", "success")
+            self._publish("archive_finished", path=run.archive_path, success=True)
+            self._publish_progress(force=True)
+            return True
+
+        if self._running:
+            self.log(f"Failed to extract {run.name}: {error_output}", "error")
+            with self._lock:
+                self.failed_files += 1
+        else:
+            self.log(f"Extraction of {run.name} was cancelled", "info")
+        self._publish("archive_finished", path=run.archive_path, success=False)
+        return False
+
+    @staticmethod
+    def _error_output(run, returncodes, progress_capture, error_capture):
+        """
+        Return the error message of an extractor that exited, leaving out its
+        progress output
+        """
+        if returncodes[0] != 0 and len(returncodes) > 1:
+            # The decompressor of a tarball reports its errors with its progress
+            error_output = strip_progress(progress_capture.text())
+        else:
+            error_output = error_capture.text()
+        failed = next((returncode for returncode in returncodes if returncode != 0), 0)
+        return error_output or f"{run.command[0]} exited with code {failed}"
+
+    def _needs_outputs(self, run):
+        """
+        Whether the files extracted from an archive must be known: to give them
+        to its duplicates, or to look for archives inside
+        """
+        return run.archive_path in self._duplicates or run.depth < self.job.recursive_depth
+
+    @staticmethod
+    def _staged_files(staging_folder):
+        """
+        Return the paths of the files of a staging folder, relative to it
+        """
+        files = []
+        for folder, _, names in os.walk(staging_folder):
+            for name in names:
+                files.append(os.path.relpath(os.path.join(folder, name), staging_folder))
+        return files
+
+    def _archive_error(self, run, error):
+        if self._running:
+            self.log(f"Error extracting {run.name}: {str(error)}", "error")
+            with self._lock:
+                self.failed_files += 1
+        else:
+            self.log(f"Extraction of {run.name} was cancelled", "info")
+        self._publish("archive_finished", path=run.archive_path, success=False)
+
+    def _cleanup_archive(self, run):
+        # Reset current file tracking
+        with self._lock:
+            self._in_flight.pop(run.worker_id, None)
+            if run.reservation is not None:
+                del self._reservations[run.worker_id]
+                self._space_released.notify_all()
+        if run.destination_lock is not None:
+            run.destination_lock.release()
+        if run.staging_folder:
+            shutil.rmtree(run.staging_folder, ignore_errors=True)
+        for temp_file in run.temp_files:
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+        if run.output_log is not None:
+            run.output_log.close()
+
+    def _open_output_log(self, archive_path):
+        """
+        Open the file receiving the full output of an archive's extractor. The
+        log folder mirrors the source folder: 'a/b.zip' logs to 'a/b.zip.log'
+        """
+        if not self.output_log_folder:
+            return None
+        # Inner archives live outside of the source folder, their '..' are dropped
+        parts = [
+            part for part in os.path.relpath(archive_path, self.source_folder).split(os.sep)
+            if part not in ("", os.curdir, os.pardir)
+        ]
+        log_name = parts.pop() + ".log"
+        if len(log_name.encode("utf-8", errors="surrogateescape")) > 255:
+            # Past the file name limit of most filesystems
+            log_name = hashlib.sha1(log_name.encode("utf-8", errors="surrogateescape")).hexdigest() + ".log"
+        log_folder = os.path.join(self.output_log_folder, *parts)
+        os.makedirs(log_folder, exist_ok=True)
+        return open(os.path.join(log_folder, log_name), "wb")
+
+    def calculate_totals(self):
+        self.scan_source()
+        if self.job.resume:
+            self._skip_completed()
+        prescan_sizes = self.job.prescan_sizes or self.job.disk_space_policy
+        if self.job.dedup or prescan_sizes:
+            # Hashes and uncompressed sizes share the per-archive cache
+            cache = HashCache(self.destination_folder).load()
+            if self.job.dedup:
+                self._find_duplicates(cache)
+            if prescan_sizes:
+                self._prescan_sizes(cache)
+            try:
+                cache.save()
+            except OSError as e:
+                self.log(f"Could not save the archive cache: {str(e)}", "error")
+
+        self.total_files = len(self.manifest)
+        self.total_size = sum(self._unpacked_sizes.get(entry.path, entry.size) for entry in self.manifest)
+        for path, duplicates in self._duplicates.items():
+            self.total_files += len(duplicates)
+            self.total_size += sum(self._unpacked_sizes.get(path, duplicate.size) for duplicate in duplicates)
+        if self.job.disk_space_policy:
+            self._check_disk_space()
+        self.manifest = self.schedule(self.manifest, self._estimated_cost)
+
+    def _estimated_cost(self, entry):
+        """
+        Cost of an archive for the scheduling policy, including the copies
+        completed along with it when deduplicating
+        """
+        cost = estimated_cost(entry, self._unpacked_sizes.get(entry.path))
+        for duplicate in self._duplicates.get(entry.path, ()):
+            cost += duplicate.size * WRITE_COST
+        return cost
+
+    def _skip_completed(self):
+        """
+        Drop from the manifest the archives already extracted by a previous run,
+        according to the completion journal
+        """
+        completed = self.journal.load()
+        if not completed:
+            return
+
+        remaining = []
+        for entry in self.manifest:
+            relative_path = os.path.relpath(entry.path, self.source_folder)
+            if completed.get(relative_path) != (entry.size, entry.mtime_ns):
+                remaining.append(entry)
+
+        skipped = len(self.manifest) - len(remaining)
+        self.manifest = remaining
+        self.log(f"Resuming: skipping {skipped} archive(s) already extracted", "info")
+
+    def _find_duplicates(self, cache):
+        """
+        Take the copies of identical archives out of the manifest; they are
+        completed by the worker extracting their first copy
+        """
+        self._duplicates = find_duplicates(self.manifest, cache)
+        if not self._duplicates:
+            return
+
+        copies = {duplicate.path for duplicates in self._duplicates.values() for duplicate in duplicates}
+        self.manifest = [entry for entry in self.manifest if entry.path not in copies]
+        self.log(f"Deduplication: {len(copies)} archive(s) identical to another one will not be extracted again",
+                 "info")
+
+    def _prescan_sizes(self, cache):
+        """
+        Read the uncompressed size of the archives of the manifest, listing
+        those missing from the cache in parallel
+        """
+        pending = []
+        for entry in self.manifest:
+            try:
+                stat = os.stat(entry.path)
+            except OSError:
+                continue
+            size = cache.get(stat, "unpacked_size")
+            if not size:
+                # Not cached; a 0 comes from the unknown sizes of older versions
+                pending.append((entry, stat))
+            else:
+                self._unpacked_sizes[entry.path] = size
+
+        creation_flags = self._creation_flags()
+        with concurrent.futures.ThreadPoolExecutor(self.max_workers) as pool:
+            sizes = pool.map(
+                lambda entry: unpacked_size(entry.path, entry.format, creation_flags),
+                [entry for entry, _ in pending]
+            )
+            for (entry, stat), size in zip(pending, sizes):
+                if not self._running:
+                    break
+                # An unknown or empty size leaves the archive weighing its own size
+                if size:
+                    self._unpacked_sizes[entry.path] = size
+                    cache.put(stat, "unpacked_size", size)
+
+        self.log(
+            f"Pre-scan: {sum(self._unpacked_sizes.values()) / (1024 * 1024):.1f} MB to write for "
+            f"{len(self._unpacked_sizes)} of {len(self.manifest)} archive(s)",
+            "info"
+        )
+
+    def scan_source(self):
+        """
+        Walk the source folder once with os.scandir and build the manifest of
+        supported archives, using the DirEntry stat cache so every file and
+        folder is only stat'd once
+        """
+        self.manifest = []
+        self.destination_folders = []
+
+        # Depth-first, top-down like os.walk; symlinked folders are not followed
+        pending = [(self.source_folder, self.destination_folder)]
+        while pending:
+            folder, destination_subfolder = pending.pop()
+            self.destination_folders.append(destination_subfolder)
+            subfolders = []
+            archives = []
+            volume_sets = {}  # set key -> [(index, ManifestEntry)] of a split archive
+
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir():
+                                if not entry.is_symlink():
+                                    subfolders.append(
+                                        (entry.path, os.path.join(destination_subfolder, entry.name))
+                                    )
+                                continue
+
+                            volume = self.format_registry.match_volume(entry.name)
+                            archive_format = volume.format if volume else self.get_archive_format(entry.name)
+                            if archive_format and entry.is_file():
+                                archive = ManifestEntry(
+                                    entry.path,
+                                    entry.stat().st_size,
+                                    archive_format,
+                                    destination_subfolder,
+                                    entry.stat().st_mtime_ns
+                                )
+                                if volume:
+                                    volume_sets.setdefault(volume.set_key, []).append((volume.index, archive))
+                                else:
+                                    archives.append(archive)
+                        except OSError:
+                            # Entry vanished or is unreadable, same as os.walk skipping it
+                            continue
+            except OSError as e:
+                self.log(f"Could not scan folder '{folder}': {str(e)}", "error")
+                continue
+
+            if volume_sets:
+                archives = self._group_volumes(archives, volume_sets)
+            self.manifest.extend(archives)
+
+            pending.extend(reversed(subfolders))
+
+        return self.manifest
+
+    def _group_volumes(self, archives, volume_sets):
+        """
+        Replace the volumes of every split archive of a folder with a single
+        entry opening its first volume, sized after the whole set
+        """
+        # 'x.zip' ends a 'x.z01' set and 'x.rar' starts a 'x.r00' set; either
+        # way it's the volume the extractor must open
+        remaining = []
+        for archive in archives:
+            set_key = self.format_registry.volume_head_key(os.path.basename(archive.path))
+            if set_key in volume_sets:
+                volume_sets[set_key].append((-1, archive))
+            else:
+                remaining.append(archive)
+
+        for (_, scheme), volumes in volume_sets.items():
+            volumes.sort(key=lambda volume: volume[0])
+            first_index, first = volumes[0]
+            if first_index != (-1 if scheme in ('zip', 'rar') else 1):
+                self.log(f"Skipping split archive {os.path.basename(first.path)}: its first volume is missing",
+                         "error")
+                continue
+            remaining.append(first._replace(
+                size=sum(volume.size for _, volume in volumes),
+                mtime_ns=max(volume.mtime_ns for _, volume in volumes),
+                volumes=tuple(volume.path for _, volume in volumes)
+            ))
+        return remaining
+
+    def is_supported_archive(self, archive_path):
+        return self.get_archive_format(archive_path) is not None
+
+    def get_archive_format(self, archive_path):
+        """
+        Return the supported format matching the archive path, or None
+        """
+        return self.format_registry.match(archive_path)
+
+    def get_extractor_command(self, archive_path, destination_folder, member_list=None):
+        # Use unrar for RAR files, it reports its progress as percentages
+        if self.format_registry.tool_for(archive_path) == 'unrar':
+            if member_list:
+                # Only the members named in the UTF-8 list file
+                return ["unrar", "x", "-y", "-scfl", archive_path, f"@{member_list}", destination_folder]
+            return ["unrar", "x", "-y", archive_path, destination_folder]
+
+        # Use 7z for all other formats, with machine-readable progress on stdout
+        # (-bsp1) and the regular listing turned off (-bso0)
+        command = ["7z", "x", "-y", "-bsp1", "-bso0", archive_path, f"-o{destination_folder}"]
+        if member_list:
+            command += ["-scsUTF-8", f"@{member_list}"]
+        return command
+
+    def get_stream_commands(self, archive_path, destination_folder):
+        """
+        Return the (decompressor, tar extractor) commands extracting a
+        compressed tarball in a single pass, without an intermediate .tar
+        """
+        return (
+            ["7z", "x", "-so", "-bsp2", archive_path],
+            ["7z", "x", "-y", "-si", "-ttar", "-bso0", "-bsp0", f"-o{destination_folder}"]
+        )
+
+    def _get_exact_path(self, path):
+        """
+        Find the exact case-sensitive path for a given path
+        """
+        normalized_path = os.path.normpath(path)
+        if os.path.exists(normalized_path):
+            return normalized_path
+
+        parts = normalized_path.split(os.sep)
+        current_path = os.sep if normalized_path.startswith(os.sep) else ''
+
+        for part in parts:
+            if not part:
+                continue
+
+            # If current path is root, check the part directly
+            if current_path in ['', os.sep]:
+                current_path = os.path.join(current_path, part)
+                continue
+
+            # List all entries in the current directory
+            try:
+                entries = os.listdir(current_path)
+                # Find case-insensitive match
+                matching_entries = [
+                    entry for entry in entries
+                    if entry.lower() == part.lower()
+                ]
+
+                if matching_entries:
+                    # Use the first matching entry (preserving original case)
+                    current_path = os.path.join(current_path, matching_entries[0])
+                else:
+                    # If no match found, return the original path
+                    return normalized_path
+            except Exception as e:
+                # If listing fails, return the original path
+                return normalized_path
+
+        return current_path
+
+    def log(self, message, status="info"):
+        # File logging goes through the queue set up by core.logSetup, so this is
+        # cheap from any worker thread
+        if status == "error":
+            logger.error(message)
+        else:  # success, info
+            logger.info(message)
+        if self.collect_logs:
+            self._log_records.append((message, status))
+        if self._listeners:
+            self._publish("log", message=message, status=status)
+
+    def take_logs(self):
+        """
+        Return and forget the log records collected since the last call
+        """
+        records = []
+        while True:
+            try:
+                records.append(self._log_records.popleft())
+            except IndexError:
+                return records
+
+    def cancel(self):
+        self._running = False
+
+        # Stop the running extractions instead of waiting for them to finish
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            try:
+                process.terminate()
+            except OSError:
+                pass
+
+    def is_running(self):
+        return self._running
+
+
+def iter_events(job):
+    """
+    Run a job on a background thread and yield its ExtractionEvents as they
+    happen, ending with 'job_finished'. Closing the generator cancels the job
+    """
+    events = queue.Queue()
+    engine = ExtractionEngine(job, listeners=[events.put], collect_logs=False)
+    job_thread = threading.Thread(target=engine.run, daemon=True)
+    job_thread.start()
+    try:
+        while True:
+            event = events.get()
+            yield event
+            if event.kind == "job_finished":
+                break
+    finally:
+        engine.cancel()
+        job_thread.join()
@@ -0,0 +1,52 @@
+import json
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FILE = "logs.log"
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+_listener = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Format every record as one JSON object per line
+    """
+
+    def format(self, record):
+        return json.dumps({
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "message": record.getMessage()
+        })
+
+
+def setup_logging(log_file=LOG_FILE, max_bytes=5 * 1024 * 1024, backup_count=3, json_lines=False):
+    """
+    Route the root logger through a queue to a background thread writing a
+    size-rotated log file, so logging never blocks the caller on file I/O
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    file_handler = RotatingFileHandler(
+        log_file,
+        maxBytes=max_bytes,
+        backupCount=backup_count,
+        encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonLinesFormatter() if json_lines else logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(QueueHandler(log_queue))
+
+    _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    # Flush the pending records when the application exits
+    atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,93 @@
+"""
+Member-level resume of a single archive: compare the archive listing with
+what is already in the destination and only extract what is missing.
+"""
+import os
+import zlib
+import subprocess
+from collections import namedtuple
+
+# Member of an archive listing, path relative to the extraction folder. size
+# is None when 7z can't tell it without decompressing (e.g. bzip2 streams)
+ArchiveMember = namedtuple("ArchiveMember", ["path", "size", "crc", "is_dir"])
+
+
+def list_members(archive_path, creation_flags=0):
+    """
+    Return the ArchiveMembers of an archive using '7z l -slt', or None if the
+    archive can't be listed
+    """
+    try:
+        result = subprocess.run(
+            ["7z", "l", "-slt", "-ba", "-sccUTF-8", archive_path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            creationflags=creation_flags
+        )
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return parse_slt_listing(result.stdout.decode("utf-8", errors="replace"))
+
+
+def parse_slt_listing(output):
+    """
+    Parse the 'Key = Value' blocks of a '7z l -slt' listing
+    """
+    members = []
+    # Without -ba the archive's own properties come first, before a '----------' line
+    if "\n----------" in output:
+        output = output.split("\n----------", 1)[1]
+
+    for block in output.replace("\r\n", "\n").split("\n\n"):
+        properties = {}
+        for line in block.splitlines():
+            key, separator, value = line.partition(" = ")
+            if separator:
+                properties[key.strip()] = value.strip()
+        path = properties.get("Path")
+        if not path:
+            continue
+
+        is_dir = properties.get("Folder") == "+" or properties.get("Attributes", "").startswith("D")
+        try:
+            size = int(properties["Size"])
+        except (KeyError, ValueError):
+            size = None
+        crc = properties.get("CRC") or None
+        members.append(ArchiveMember(path, size, crc, is_dir))
+    return members
+
+
+def file_crc(path):
+    crc = 0
+    with open(path, "rb") as member_file:
+        while True:
+            chunk = member_file.read(1024 * 1024)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+    return f"{crc:08X}"
+
+
+def missing_members(members, destination_folder, verify_crc=False):
+    """
+    Return the paths of the members that are missing from the destination,
+    truncated, or (with verify_crc) whose content doesn't match their CRC.
+    Members of unknown size only have to exist
+    """
+    missing = []
+    for path, size, crc, is_dir in members:
+        if is_dir:
+            continue
+        target = os.path.join(destination_folder, path)
+        try:
+            target_size = os.path.getsize(target)
+            if size is not None and target_size != size:
+                missing.append(path)
+            elif verify_crc and crc and file_crc(target) != crc.upper():
+                missing.append(path)
+        except OSError:
+            missing.append(path)
+    return missing
@@ -0,0 +1,207 @@
+"""
+In-process extraction of small zip, tar and gzip/bzip2/xz archives with the
+standard library, saving the start-up of a 7z process per archive.
+
+Member paths are sanitized the way 7z does it (absolute paths, drive letters
+and '..' components are dropped), and nothing is written through a symbolic
+link leading out of the destination folder.
+"""
+import os
+import bz2
+import gzip
+import lzma
+import shutil
+import stat
+import time
+import tarfile
+import zipfile
+
+# Formats handled in-process, by the format matched by FormatRegistry
+TAR_FORMATS = frozenset(['.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz'])
+COMPRESSED_FILE_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+NATIVE_FORMATS = frozenset(['.zip']) | TAR_FORMATS | frozenset(COMPRESSED_FILE_OPENERS)
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class ExtractionCancelled(Exception):
+    """
+    Raised when the progress callback asks to stop the extraction
+    """
+
+
+class SafeDestination:
+    """
+    Maps archive member names to paths inside a destination folder
+    """
+
+    def __init__(self, destination_folder):
+        self.folder = os.path.abspath(destination_folder)
+        self._root = os.path.realpath(self.folder)
+        self._checked_folders = set()
+
+    def target(self, member_name):
+        """
+        Return the path a member extracts to, or None if nothing is left of
+        its name once sanitized
+        """
+        parts = []
+        for part in member_name.replace("\\", "/").split("/"):
+            if part in ("", ".", ".."):
+                continue
+            # Drive letters ('C:') and alternate data streams
+            part = part.replace(":", "_")
+            parts.append(part)
+        if not parts:
+            return None
+        return os.path.join(self.folder, *parts)
+
+    def contains(self, path):
+        real_path = os.path.realpath(path)
+        return real_path == self._root or real_path.startswith(self._root + os.sep)
+
+    def prepare_parent(self, path):
+        self.prepare_folder(os.path.dirname(path))
+
+    def prepare_folder(self, folder):
+        """
+        Create a folder, refusing folders reached through a symbolic link
+        leading out of the destination
+        """
+        if folder in self._checked_folders:
+            return
+        os.makedirs(folder, exist_ok=True)
+        if not self.contains(folder):
+            raise OSError(f"'{folder}' is outside of the destination folder")
+        self._checked_folders.add(folder)
+
+    def link_allowed(self, path, link_target):
+        if os.path.isabs(link_target):
+            return False
+        return self.contains(os.path.join(os.path.dirname(path), link_target))
+
+
+def extract_native(archive_path, archive_format, destination_folder, on_progress=None):
+    """
+    Extract an archive of one of NATIVE_FORMATS and return the number of
+    files extracted. on_progress(fraction, files) is called after every
+    member; returning False stops the extraction with ExtractionCancelled.
+    Corrupted or unsupported archives raise the exception of the module
+    reading them
+    """
+    destination = SafeDestination(destination_folder)
+    if archive_format == '.zip':
+        return _extract_zip(archive_path, destination, on_progress)
+    if archive_format in TAR_FORMATS:
+        return _extract_tar(archive_path, destination, on_progress)
+    return _extract_compressed_file(archive_path, archive_format, destination, on_progress)
+
+
+def _report(on_progress, fraction, files):
+    if on_progress is not None and on_progress(min(fraction, 1.0), files) is False:
+        raise ExtractionCancelled()
+
+
+def _write_file(source, path):
+    if os.path.lexists(path):
+        # Overwrite like '7z x -y', without following a link in its place
+        os.remove(path)
+    with open(path, "wb") as target:
+        shutil.copyfileobj(source, target, COPY_BUFFER_SIZE)
+
+
+def _make_link(destination, path, link_target):
+    if not destination.link_allowed(path, link_target):
+        return False
+    if os.path.lexists(path):
+        os.remove(path)
+    try:
+        os.symlink(link_target, path)
+    except (OSError, NotImplementedError):
+        # No symbolic link support (e.g. Windows without the privilege)
+        return False
+    return True
+
+
+def _extract_zip(archive_path, destination, on_progress):
+    files = 0
+    with zipfile.ZipFile(archive_path) as archive:
+        members = archive.infolist()
+        total = sum(member.compress_size for member in members) or 1
+        done = 0
+        for member in members:
+            path = destination.target(member.filename)
+            done += member.compress_size
+            if path is None:
+                continue
+
+            mode = member.external_attr >> 16
+            if member.is_dir():
+                destination.prepare_folder(path)
+            else:
+                destination.prepare_parent(path)
+                if stat.S_ISLNK(mode):
+                    _make_link(destination, path, archive.read(member).decode("utf-8"))
+                else:
+                    with archive.open(member) as source:
+                        _write_file(source, path)
+                    if mode & 0o777:
+                        os.chmod(path, mode & 0o777)
+                    mtime = _zip_mtime(member)
+                    if mtime is not None:
+                        os.utime(path, (mtime, mtime))
+                    files += 1
+            _report(on_progress, done / total, files)
+    return files
+
+
+def _zip_mtime(member):
+    try:
+        return time.mktime(member.date_time + (0, 0, -1))
+    except (OverflowError, ValueError):
+        return None
+
+
+def _extract_tar(archive_path, destination, on_progress):
+    files = 0
+    total = os.path.getsize(archive_path) or 1
+    with open(archive_path, "rb") as raw, tarfile.open(fileobj=raw, mode="r:*") as archive:
+        for member in archive:
+            path = destination.target(member.name)
+            if path is not None:
+                if member.isdir():
+                    destination.prepare_folder(path)
+                elif member.isfile():
+                    destination.prepare_parent(path)
+                    _write_file(archive.extractfile(member), path)
+                    if os.name != "nt":
+                        os.chmod(path, member.mode & 0o777)
+                    os.utime(path, (member.mtime, member.mtime))
+                    files += 1
+                elif member.issym():
+                    destination.prepare_parent(path)
+                    _make_link(destination, path, member.linkname)
+                elif member.islnk():
+                    # Hard links are restored as copies of their target
+                    link_source = destination.target(member.linkname)
+                    if link_source is not None and os.path.isfile(link_source):
+                        destination.prepare_parent(path)
+                        if os.path.lexists(path):
+                            os.remove(path)
+                        shutil.copy2(link_source, path)
+                        files += 1
+                # Devices and fifos are skipped
+            # The position in the compressed file tells the progress
+            _report(on_progress, raw.tell() / total, files)
+    return files
+
+
+def _extract_compressed_file(archive_path, archive_format, destination, on_progress):
+    # Named after the archive without its extension, as 7z does
+    name = os.path.splitext(os.path.basename(archive_path))[0]
+    path = destination.target(name)
+    destination.prepare_parent(path)
+    with COMPRESSED_FILE_OPENERS[archive_format](archive_path, "rb") as source:
+        _write_file(source, path)
+    _report(on_progress, 1.0, 1)
+    return 1
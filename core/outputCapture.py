@@ -0,0 +1,34 @@
+class OutputCapture:
+    """
+    Bounded capture of an extractor's output stream. Only the last 'limit'
+    bytes are kept in memory for error reporting; the full stream can
+    optionally be written to a log file as it arrives
+    """
+
+    def __init__(self, limit=64 * 1024, log_file=None):
+        self.limit = limit
+        self.log_file = log_file
+        self._tail = bytearray()
+
+    def write(self, chunk):
+        self._tail += chunk
+        # Trim lazily so a stream of small chunks doesn't shift the buffer every time
+        if len(self._tail) > 2 * self.limit:
+            del self._tail[:-self.limit]
+        if self.log_file is not None:
+            self.log_file.write(chunk)
+
+    def drain(self, stream, on_chunk=None):
+        """
+        Read the stream until EOF, keeping its tail and passing each chunk on
+        """
+        while True:
+            chunk = stream.read1(65536)
+            if not chunk:
+                break
+            self.write(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+
+    def text(self):
+        return bytes(self._tail[-self.limit:]).decode(errors="replace").strip()
@@ -0,0 +1,71 @@
+import re
+
+# 7z and unrar redraw their progress in place with carriage returns and backspaces
+_SEGMENT_SEPARATORS = re.compile(rb"[\r\n\b]+")
+
+# 7z -bsp1: " 45% 12 - folder/file.txt" (the member count is missing at the start)
+_SEVEN_Z_PROGRESS = re.compile(rb"(\d{1,3})%(?:\s+(\d+))?")
+
+# unrar: "Extracting  folder/file.txt   45%" then "  OK " once the member is done
+_UNRAR_PROGRESS = re.compile(rb"(\d{1,3})%")
+
+_TEXT_SEPARATORS = re.compile(r"[\r\n\b]+")
+_SEVEN_Z_PROGRESS_LINE = re.compile(r"^\s*\d{1,3}%")
+
+
+def strip_progress(output):
+    """
+    Remove the 7z progress lines from text captured from a stream mixing them
+    with error messages
+    """
+    return "\n".join(
+        segment for segment in _TEXT_SEPARATORS.split(output)
+        if segment.strip() and not _SEVEN_Z_PROGRESS_LINE.match(segment)
+    )
+
+
+class ProgressParser:
+    """
+    Incremental parser for the progress stream of 7z (-bsp1) and unrar.
+    Feed it raw chunks as they are read from the pipe; percent and members
+    always hold the latest values seen
+    """
+
+    def __init__(self, tool):
+        self.tool = tool
+        self.percent = 0
+        self.members = 0
+        self._pending = b""
+
+    def feed(self, data):
+        segments = _SEGMENT_SEPARATORS.split(self._pending + data)
+        # The last segment may be cut in the middle, keep it for the next chunk
+        self._pending = segments.pop()[-256:]
+
+        if self.tool == 'unrar':
+            self._feed_unrar(segments)
+        else:
+            self._feed_seven_z(segments)
+
+    def _feed_seven_z(self, segments):
+        # Only the most recent progress line matters
+        for segment in reversed(segments):
+            match = _SEVEN_Z_PROGRESS.search(segment)
+            if match:
+                self.percent = max(self.percent, min(int(match.group(1)), 100))
+                if match.group(2):
+                    self.members = max(self.members, int(match.group(2)))
+                return
+
+    def _feed_unrar(self, segments):
+        for segment in segments:
+            stripped = segment.strip()
+            if stripped == b"OK":
+                self.members += 1
+                continue
+            match = _UNRAR_PROGRESS.search(stripped)
+            if match:
+                self.percent = max(self.percent, min(int(match.group(1)), 100))
+
+    def fraction(self):
+        return self.percent / 100
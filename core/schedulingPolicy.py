@@ -0,0 +1,81 @@
+"""
+Order in which the archives of a job are handed to the workers.
+
+A policy is a function taking the manifest entries and a cost function, and
+returning the entries in the order they should be extracted. With several
+workers, starting with the most expensive archives (longest processing time
+first) keeps a huge archive from running alone at the end of the job.
+"""
+
+# Relative cost of reading one byte of an archive, by format: LZMA and bzip2
+# decompress several times slower than deflate, plain tar and disk images are
+# mostly copied
+FORMAT_COST = {
+    '.7z': 3.0,
+    '.xz': 3.0,
+    '.txz': 3.0,
+    '.tar.xz': 3.0,
+    '.bz2': 2.5,
+    '.tbz2': 2.5,
+    '.tar.bz2': 2.5,
+    '.rar': 1.5,
+    '.zip': 1.0,
+    '.gz': 1.0,
+    '.tgz': 1.0,
+    '.tar.gz': 1.0,
+    '.cab': 1.0,
+    '.arj': 1.0,
+    '.lzh': 1.0,
+    '.tar': 0.3,
+    '.iso': 0.3,
+    '.wim': 1.0,
+}
+
+# Relative cost of writing one byte of extracted data
+WRITE_COST = 0.5
+
+
+def estimated_cost(entry, unpacked_size=None):
+    """
+    Estimate the time an archive takes to extract, in arbitrary units, from
+    its size, its format and its uncompressed size when known
+    """
+    cost = entry.size * FORMAT_COST.get(entry.format, 1.0)
+    if unpacked_size is not None:
+        cost += unpacked_size * WRITE_COST
+    return cost
+
+
+def directory_order(entries, cost):
+    # The order of the scan
+    return list(entries)
+
+
+def largest_first(entries, cost):
+    return sorted(entries, key=cost, reverse=True)
+
+
+def smallest_first(entries, cost):
+    return sorted(entries, key=cost)
+
+
+SCHEDULING_POLICIES = {
+    "directory": directory_order,
+    "largest_first": largest_first,
+    "smallest_first": smallest_first,
+}
+
+
+def get_policy(policy):
+    """
+    Return the policy function for a name of SCHEDULING_POLICIES, or the
+    policy itself if it is already a function
+    """
+    if callable(policy):
+        return policy
+    try:
+        return SCHEDULING_POLICIES[policy]
+    except KeyError:
+        raise ValueError(
+            f"Unknown scheduling policy '{policy}' (available: {', '.join(SCHEDULING_POLICIES)})"
+        ) from None
@@ -0,0 +1,29 @@
+"""
+Pre-scan of the uncompressed size of archives, so that progress and ETA
+follow the bytes written rather than the bytes read.
+"""
+import zipfile
+from core.memberResume import list_members
+
+
+def unpacked_size(archive_path, archive_format, creation_flags=0):
+    """
+    Return the total uncompressed size of an archive's files, or None if it
+    can't be read or the size of some file is unknown. Zip archives are read from their central directory
+    in-process, other formats are listed with '7z l -slt'
+    """
+    if archive_format == '.zip':
+        try:
+            with zipfile.ZipFile(archive_path) as archive:
+                return sum(member.file_size for member in archive.infolist())
+        except (zipfile.BadZipFile, OSError, ValueError):
+            # Split, self-extracting or damaged: let 7z have a look
+            pass
+
+    members = list_members(archive_path, creation_flags)
+    if not members:
+        return None
+    sizes = [member.size for member in members if not member.is_dir]
+    if None in sizes:
+        return None
+    return sum(sizes)
@@ -173,9 +173,10 @@ class Ui_Main(object):
         self.progressLayout.addLayout(self.statsLayout)
 
         # Logs
-        self.txtLogs = QtWidgets.QTextEdit()
+        self.txtLogs = QtWidgets.QPlainTextEdit()
         self.txtLogs.setObjectName("txtLogs")
         self.txtLogs.setReadOnly(True)
+        self.txtLogs.setMaximumBlockCount(5000)
         self.txtLogs.setMinimumHeight(150)
         self.progressLayout.addWidget(self.txtLogs)
 
@@ -332,7 +333,7 @@ class Ui_Main(object):
                 border-radius: 4px;
                 background-color: white;
             }
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 border: 1px solid #bdc3c7;
                 border-radius: 4px;
                 background-color: white;
@@ -1,6 +1,6 @@
 from PyQt6.QtWidgets import QMainWindow, QFileDialog, QMessageBox, QApplication, QDialog, QVBoxLayout, QTextEdit
 from PyQt6.QtGui import QPalette
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from gui.gui_interface import Ui_Main
 from core.extractArchives import ArchiveExtractor
 from gui.themes import DARK_THEME_STYLESHEET, LIGHT_THEME_STYLESHEET
@@ -10,10 +10,23 @@ import subprocess
 import shutil
 import sys
 import time
-import logging
+import html
 import webbrowser
 
 
+# Log message colors for each theme, resolved once when the theme is applied
+DARK_LOG_COLORS = {
+    "success": "#4CAF50",  # Green
+    "error": "#f44336",  # Red
+    "info": "#2196F3"  # Blue
+}
+LIGHT_LOG_COLORS = {
+    "success": "#2e7d32",  # Darker Green
+    "error": "#d32f2f",  # Darker Red
+    "info": "#1976d2"  # Darker Blue
+}
+
+
 class UsageInstructionsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -64,6 +77,13 @@ class MainWindow(QMainWindow):
         self.ui.setupUi(self)
         self.setWindowTitle("MultiArchiveExtractor v1.0.0")
         self.start_time = None
+        self.log_colors = LIGHT_LOG_COLORS
+
+        # Log records and progress are collected by the extractor and rendered
+        # at a fixed rate (10 Hz), whatever the number of archives or workers
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(100)
+        self.refresh_timer.timeout.connect(self.refresh_extraction_status)
 
         self.check_dependencies()
         self.apply_system_theme()
@@ -131,9 +151,11 @@ class MainWindow(QMainWindow):
 
     def apply_dark_theme(self):
         self.setStyleSheet(DARK_THEME_STYLESHEET)
+        self.log_colors = DARK_LOG_COLORS
 
     def apply_light_theme(self):
         self.setStyleSheet(LIGHT_THEME_STYLESHEET)
+        self.log_colors = LIGHT_LOG_COLORS
 
     def toggle_theme(self):
         """Toggle between dark and light themes."""
@@ -142,14 +164,18 @@ class MainWindow(QMainWindow):
         else:
             self.apply_light_theme()
 
-    def update_progress(self, current_files, total_files, current_bytes, total_bytes, extraction_speed):
+    def update_progress(self, current_files, total_files, current_bytes, total_bytes, extraction_speed,
+                        members_done=0):
         # Update progress bar
         percentage = int((current_bytes / total_bytes * 100) if total_bytes > 0 else 0)
         self.ui.progressBar.setValue(percentage)
         self.ui.lblProgressValue.setText(f"{percentage}%")
 
-        # Update files processed
-        self.ui.lblFilesProcessedValue.setText(f"{current_files} / {total_files}")
+        # Update files processed, with the number of files extracted from the archives
+        files_text = f"{current_files} / {total_files}"
+        if members_done:
+            files_text += f" ({members_done} extracted)"
+        self.ui.lblFilesProcessedValue.setText(files_text)
 
         # Update data processed
         processed_str = self.format_size(current_bytes)
@@ -169,8 +195,6 @@ class MainWindow(QMainWindow):
         else:
             self.ui.lblETAValue.setText("Calculating...")
 
-        QApplication.processEvents()
-
     def format_time(self, seconds):
         """Format time in seconds to a human-readable string"""
         if seconds < 60:
@@ -270,12 +294,11 @@ class MainWindow(QMainWindow):
 
         # Create and start extractor thread
         self.extractor = ArchiveExtractor(source_folder, destination_folder, selected_formats)
-        self.extractor.progress_signal.connect(self.update_progress)
-        self.extractor.log_signal.connect(self.update_log)
         self.extractor.finished.connect(self.on_extraction_finished)
 
         self.start_time = time.time()
         self.extractor.start()
+        self.refresh_timer.start()
 
     def cancel_extraction(self):
         if self.extractor and self.extractor.is_running():
@@ -374,6 +397,8 @@ class MainWindow(QMainWindow):
         self.ui.actionClearLogs.setEnabled(state)
 
     def on_extraction_finished(self, time_taken, was_cancelled):
+        self.refresh_timer.stop()
+        self.refresh_extraction_status()
         self.update_ui_state(True)
         self.ui.btnCancelDecompression.setEnabled(False)
 
@@ -393,7 +418,7 @@ class MainWindow(QMainWindow):
     def on_extraction_cancelled(self):
         self.update_ui_state(True)
         QMessageBox.information(self, "Extraction Cancelled", "The extraction process has sucessfully been cancelled.")
-        self.ui.txtLogs.append('<font color="red">Extraction cancelled by the user.</font>')
+        self.ui.txtLogs.appendHtml('<font color="red">Extraction cancelled by the user.</font>')
         self.ui.progressBar.setStyleSheet("QProgressBar::chunk{background-color: #06b025;}")
 
     def clear_logs(self):
@@ -431,45 +456,34 @@ class MainWindow(QMainWindow):
     def close_app(self):
         QApplication.quit()
 
-    def update_log(self, message, status):
-        """Update the log text edit with colored messages"""
-        if platform.system() == "Windows":
-            try:
-                key = winreg.OpenKey(
-                    winreg.HKEY_CURRENT_USER,
-                    r'Software\Microsoft\Windows\CurrentVersion\Themes\Personalize'
-                )
-                dark_mode, _ = winreg.QueryValueEx(key, 'AppsUseLightTheme')
-                is_dark_mode = value == 0
-            except:
-                is_dark_mode = False
-        else:
-            is_dark_mode = False
-
-        if is_dark_mode:
-            colors = {
-                "success": "#4CAF50",  # Green
-                "error": "#f44336",  # Red
-                "info": "#2196F3"  # Blue
-            }
-        else:
-            colors = {
-                "success": "#2e7d32",  # Darker Green
-                "error": "#d32f2f",  # Darker Red
-                "info": "#1976d2"  # Darker Blue
-            }
-
-        color = colors.get(status, colors["info"])
-
-        if status == "success":
-            logging.info(message)
-        elif status == "error":
-            logging.error(message)
-        else:  # info
-            logging.info(message)
-
-        formatted_message = f'<font color="{color}">{message}</font>'
-        self.ui.txtLogs.append(formatted_message)
+    def refresh_extraction_status(self):
+        """Render the latest progress snapshot and the pending log records"""
+        if self.extractor is None:
+            return
+        self.update_progress(*self.extractor.progress_snapshot())
+        self.flush_logs()
+
+    def flush_logs(self):
+        """Render the log records batched by the extractor since the last flush"""
+        if self.extractor is None:
+            return
+        records = self.extractor.take_logs()
+        if records:
+            self.update_log(records)
+
+    def update_log(self, records):
+        """Append a batch of (message, status) records to the log view with colored messages"""
+        # Older records would be dropped by the view's block limit anyway
+        max_blocks = self.ui.txtLogs.maximumBlockCount()
+        if max_blocks > 0:
+            records = records[-max_blocks:]
+
+        self.ui.txtLogs.setUpdatesEnabled(False)
+        for message, status in records:
+            color = self.log_colors.get(status, self.log_colors["info"])
+            self.ui.txtLogs.appendHtml(f'<font color="{color}">{html.escape(message)}</font>')
+        self.ui.txtLogs.setUpdatesEnabled(True)
+
         self.ui.txtLogs.verticalScrollBar().setValue(
             self.ui.txtLogs.verticalScrollBar().maximum()
         )
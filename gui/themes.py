@@ -11,7 +11,7 @@ DARK_THEME_STYLESHEET = """
         background-color: #2a82da;
         border-radius: 3px;
     }
-    QTextEdit {
+    QTextEdit, QPlainTextEdit {
         background-color: #1a1a1a;
         border: 1px solid #3a3a3a;
         border-radius: 4px;
@@ -120,7 +120,7 @@ LIGHT_THEME_STYLESHEET = """
         background-color: #0078d4;
         border-radius: 3px;
     }
-    QTextEdit {
+    QTextEdit, QPlainTextEdit {
         background-color: #ffffff;
         border: 1px solid #c8c8c8;
         border-radius: 4px;
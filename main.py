@@ -3,8 +3,10 @@ import os
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtGui import QIcon
 from gui.mainWindow import MainWindow
+from core.logSetup import setup_logging
 
 def main():
+    setup_logging()
     app = QApplication(sys.argv)
 
     # Handle PyInstaller's temporary directory